@@ -197,6 +197,35 @@ class PositionSearchProblem(search.SearchProblem):
 
         return successors
 
+    def get_predecessors(self, state):
+        """
+    Returns the positions a move leads to state from, with the action of
+    that move and its cost: the moves are symmetric, so these are the
+    successors' positions with the opposite actions.
+    """
+        predecessors = []
+        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
+            x, y = state
+            dx, dy = Actions.directionToVector(action)
+            prevx, prevy = int(x - dx), int(y - dy)
+            if not self.walls[prevx][prevy]:
+                predecessors.append(((prevx, prevy), action, self.costFn(state)))
+
+        # Bookkeeping for display purposes
+        self._expanded += 1
+        return predecessors
+
+    def get_goal_states(self):
+        return [self.goal]
+
+    def get_result(self, state, action):
+        """
+    Returns the position action leads to from state.
+    """
+        x, y = state
+        dx, dy = Actions.directionToVector(action)
+        return (int(x + dx), int(y + dy))
+
     def get_cost_of_actions(self, actions):
         """
     Returns the cost of a particular sequence of actions.  If those actions
@@ -245,6 +274,12 @@ def manhattanHeuristic(position, problem, info={}):
     xy2 = problem.goal
     return abs(xy1[0] - xy2[0]) + abs(xy1[1] - xy2[1])
 
+def manhattanStartHeuristic(position, problem, info={}):
+    "The Manhattan distance to the start, for searching a PositionSearchProblem backwards"
+    xy1 = position
+    xy2 = problem.get_start_state()
+    return abs(xy1[0] - xy2[0]) + abs(xy1[1] - xy2[1])
+
 def euclideanHeuristic(position, problem, info={}):
     "The Euclidean distance heuristic for a PositionSearchProblem"
     xy1 = position
@@ -542,4 +577,4 @@ def mazeDistance(point1, point2, gameState):
     assert not walls[x1][y1], 'point1 is a wall: ' + point1
     assert not walls[x2][y2], 'point2 is a wall: ' + str(point2)
     prob = PositionSearchProblem(gameState, start=point1, goal=point2, warn=False)
-    return len(search.bfs(prob))
\ No newline at end of file
+    return len(search.bibfs(prob))
\ No newline at end of file
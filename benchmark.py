@@ -0,0 +1,403 @@
+"""
+Benchmarks for the Blokus search code.
+
+USAGE:      python benchmark.py <options>
+EXAMPLES:   python benchmark.py -b movegen
+            python benchmark.py -b movegen -s 14 20 30 -n 50
+            python benchmark.py -b parallel -w 1,2,4,8
+            python benchmark.py -b frontier
+            python benchmark.py -b ties
+            python benchmark.py -b nodes --num-nodes 100000
+            python benchmark.py -b replay
+            python benchmark.py -b bidirectional -m 51,101,201
+"""
+import os
+import random
+import time
+import tracemalloc
+from optparse import OptionParser
+
+import search
+import util
+from blokus_problems import BlokusCoverProblem, BlokusFillProblem, blokus_cover_heuristic
+from board import Board
+from pieces import PieceList
+
+
+def time_call(func, repeat):
+    """
+    Call func() <repeat> times and return (last result, seconds per call).
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def random_game(board_w, board_h, piece_list, num_moves, seed):
+    """
+    Play <num_moves> random moves of a four player game and return the list
+    of (player, move) played.
+    """
+    rng = random.Random(seed)
+    board = new_game_board(board_w, board_h, piece_list)
+    played = []
+    passed = set()
+    player = 0
+    while len(played) < num_moves and len(passed) < 4:
+        moves = board.get_legal_moves(player)
+        if moves:
+            move = rng.choice(moves)
+            board.add_move(player, move)
+            played.append((player, move))
+        else:
+            passed.add(player)
+        player = (player + 1) % 4
+    return played
+
+
+def new_game_board(board_w, board_h, piece_list, **board_args):
+    """
+    A four player board with every player starting from their own corner.
+    """
+    board = Board(board_w, board_h, 4, piece_list, **board_args)
+    board.set_starting_point(1, (0, board_w - 1))
+    board.set_starting_point(2, (board_h - 1, 0))
+    board.set_starting_point(3, (board_h - 1, board_w - 1))
+    return board
+
+
+def benchmark_move_generation(sizes, piece_list, num_moves, repeat, seed=0):
+    """
+    Compare the anchor based get_legal_moves with the vectorized one on
+    four player games, at the start, middle and end of <num_moves> random
+    moves on each board size.
+    """
+    print("%-7s %6s %7s %12s %12s %8s" % ('board', 'moves', 'legal', 'scalar ms', 'vector ms', 'speedup'))
+    for size in sizes:
+        played = random_game(size, size, piece_list, num_moves, seed)
+        for stop in sorted({0, len(played) // 2, len(played)}):
+            scalar = new_game_board(size, size, piece_list)
+            vectorized = new_game_board(size, size, piece_list, vectorized=True)
+            for (player, move) in played[:stop]:
+                scalar.add_move(player, move)
+                vectorized.add_move(player, move)
+
+            player = stop % 4
+            scalar_moves, scalar_time = time_call(lambda: scalar.get_legal_moves(player), repeat)
+            vector_moves, vector_time = time_call(lambda: vectorized.get_legal_moves(player), repeat)
+            if scalar_moves != vector_moves:
+                raise Exception('move generators disagree on a %dx%d board' % (size, size))
+            print("%-7s %6d %7d %12.3f %12.3f %7.2fx" % ('%dx%d' % (size, size), stop, len(scalar_moves),
+                                                       scalar_time * 1000, vector_time * 1000,
+                                                       scalar_time / vector_time))
+
+
+def maze_problem(layout):
+    """
+    The PositionSearchProblem of the pacman maze <layout> (a Layout or the
+    name of one), from the pacman start to the food, with the Manhattan
+    distance heuristic.
+    """
+    import PCF.layout
+    import PCF.pacman
+    import PCF.searchAgents
+
+    if isinstance(layout, str):
+        layout = PCF.layout.getLayout(layout)
+    game_state = PCF.pacman.GameState()
+    game_state.initialize(layout, 0)
+    goal = game_state.getFood().asList()[0]
+    problem = PCF.searchAgents.PositionSearchProblem(game_state, goal=goal, warn=False)
+    return problem, PCF.searchAgents.manhattanHeuristic
+
+
+def generate_maze(size, seed, loops=0.05):
+    """
+    A random <size> x <size> pacman maze (an even size is rounded up) with
+    the pacman in one corner and the food in the opposite one: a maze
+    carved by a randomized depth first search, with a <loops> fraction of
+    its inner walls knocked down so that there is more than one way through.
+    """
+    import PCF.layout
+
+    size |= 1
+    rng = random.Random(seed)
+    grid = [['%'] * size for _ in range(size)]
+    grid[1][1] = ' '
+    stack = [(1, 1)]
+    while stack:
+        (x, y) = stack[-1]
+        neighbors = [(x + dx, y + dy) for (dx, dy) in ((2, 0), (-2, 0), (0, 2), (0, -2))
+                     if 0 < x + dx < size - 1 and 0 < y + dy < size - 1 and grid[y + dy][x + dx] == '%']
+        if not neighbors:
+            stack.pop()
+            continue
+        (next_x, next_y) = rng.choice(neighbors)
+        grid[(y + next_y) // 2][(x + next_x) // 2] = ' '
+        grid[next_y][next_x] = ' '
+        stack.append((next_x, next_y))
+    walls = [(x, y) for y in range(1, size - 1) for x in range(1, size - 1)
+             if grid[y][x] == '%' and (x + y) % 2 == 1]
+    for (x, y) in rng.sample(walls, int(loops * len(walls))):
+        grid[y][x] = ' '
+    grid[1][1] = 'P'
+    grid[size - 2][size - 2] = '.'
+    return PCF.layout.Layout([''.join(row) for row in grid])
+
+
+def benchmark_bidirectional_search(sizes):
+    """
+    Compare breadth first search and A* with their bidirectional versions
+    on mediumMaze and on generated mazes of each size.
+    """
+    import PCF.searchAgents
+
+    instances = [('mediumMaze', 'mediumMaze')]
+    instances += [('maze %dx%d' % (size | 1, size | 1), generate_maze(size, seed=size)) for size in sizes]
+    searches = [('bfs', lambda problem, heuristic, stats: search.breadth_first_search(problem, stats=stats)),
+                ('bibfs', lambda problem, heuristic, stats: search.bidirectional_breadth_first_search(
+                    problem, stats=stats)),
+                ('astar', lambda problem, heuristic, stats: search.a_star_search(problem, heuristic, stats=stats)),
+                ('biastar', lambda problem, heuristic, stats: search.bidirectional_a_star_search(
+                    problem, heuristic, PCF.searchAgents.manhattanStartHeuristic, stats=stats))]
+    print("%-12s %-8s %6s %9s %9s %10s" % ('problem', 'search', 'cost', 'expanded', 'generated', 'seconds'))
+    for (name, layout) in instances:
+        for (search_name, search_func) in searches:
+            problem, heuristic = maze_problem(layout)
+            stats = search.SearchStats()
+            path = search_func(problem, heuristic, stats)
+            print("%-12s %-8s %6g %9d %9d %10.3f" % (name, search_name, problem.get_cost_of_actions(path),
+                                                    stats.expanded, stats.generated, stats.total_time))
+
+
+def benchmark_parallel_search(worker_counts):
+    """
+    Time parallel_a_star_search with each number of workers against
+    a_star_search, on a Blokus cover problem and on a pacman maze.
+    """
+    instances = [('cover 10x10', lambda: (BlokusCoverProblem(10, 10, PieceList('small_set.txt'), (3, 3),
+                                                             [(2, 2), (5, 5), (6, 7)]),
+                                          blokus_cover_heuristic)),
+                 ('mediumMaze', lambda: maze_problem('mediumMaze'))]
+    print("%d cpus" % os.cpu_count())
+    print("%-12s %8s %6s %9s %9s %8s" % ('problem', 'workers', 'cost', 'expanded', 'seconds', 'speedup'))
+    for (name, make_problem) in instances:
+        problem, heuristic = make_problem()
+        stats = search.SearchStats()
+        path = search.a_star_search(problem, heuristic, stats=stats)
+        print("%-12s %8s %6g %9d %9.3f" % (name, 'serial', problem.get_cost_of_actions(path), stats.expanded,
+                                           stats.total_time))
+        one_worker_time = None
+        for workers in worker_counts:
+            problem, heuristic = make_problem()
+            stats = search.SearchStats()
+            path = search.parallel_a_star_search(problem, heuristic, workers, stats=stats)
+            if one_worker_time is None:
+                one_worker_time = stats.total_time
+            print("%-12s %8d %6g %9d %9.3f %7.2fx" % (name, workers, problem.get_cost_of_actions(path),
+                                                      stats.expanded, stats.total_time,
+                                                      one_worker_time / stats.total_time))
+
+
+def problem_set_instances():
+    """
+    The instances of layouts/Problem_set.txt that uniform cost search or A*
+    solve in seconds, as (name, make_problem, heuristic or None).
+    """
+    targets = [(2, 2), (5, 5), (6, 7)]
+    return [('cover 8x8', lambda: BlokusCoverProblem(8, 8, PieceList('small_set.txt'), (3, 3), targets),
+             blokus_cover_heuristic),
+            ('cover 10x10', lambda: BlokusCoverProblem(10, 10, PieceList('small_set.txt'), (3, 3), targets),
+             blokus_cover_heuristic),
+            ('fill 4x7', lambda: BlokusFillProblem(4, 7, PieceList('tiny_set.txt')), None)]
+
+
+def benchmark_frontiers(repeat):
+    """
+    Run A* (uniform cost search without a heuristic) on the Problem_set
+    instances with each priority queue as the frontier, and report the
+    frontier operations (pushes and pops) per second of queue time.
+    """
+    frontiers = [('heapq', lambda key: util.PriorityQueue(), search.DUPLICATES_ON_EXPAND),
+                 ('indexed heap', util.IndexedPriorityQueue, search.DUPLICATES_ON_EXPAND),
+                 ('buckets', util.BucketPriorityQueue, search.DUPLICATES_ON_EXPAND)]
+    print("%-12s %-13s %5s %9s %9s %10s %12s %10s" % ('problem', 'frontier', 'cost', 'expanded', 'generated',
+                                                    'queue ms', 'ops/s', 'total ms'))
+    for (name, make_problem, heuristic) in problem_set_instances():
+        for (frontier_name, make_frontier, duplicates) in frontiers:
+            queue_time = total_time = 0.0
+            for _ in range(repeat):
+                problem = make_problem()
+                stats = search.SearchStats()
+                frontier = make_frontier(lambda node: problem.state_key(node.get_state()))
+                path = search.graph_search(problem, frontier, priority=search.estimated_cost, heuristic=heuristic,
+                                           duplicates=duplicates, stats=stats)
+                queue_time += stats.queue_time
+                total_time += stats.total_time
+            operations = stats.generated + stats.expanded + stats.duplicates
+            print("%-12s %-13s %5d %9d %9d %10.2f %12.0f %10.1f" % (name, frontier_name,
+                                                                     problem.get_cost_of_actions(path),
+                                                                     stats.expanded, stats.generated,
+                                                                     queue_time * 1000 / repeat,
+                                                                     operations * repeat / queue_time,
+                                                                     total_time * 1000 / repeat))
+
+
+def benchmark_tie_breaking():
+    """
+    Report the nodes A* (uniform cost search without a heuristic) expands on
+    the Problem_set instances with each tie breaking policy.
+    """
+    print("%-12s %-8s %5s %9s %9s %10s" % ('problem', 'ties', 'cost', 'expanded', 'generated', 'seconds'))
+    for (name, make_problem, heuristic) in problem_set_instances():
+        for policy in search.TIE_BREAKING_POLICIES:
+            problem = make_problem()
+            stats = search.SearchStats()
+            if heuristic is None:
+                path = search.uniform_cost_search(problem, stats=stats, tie_breaking=policy)
+            else:
+                path = search.a_star_search(problem, heuristic, stats=stats, tie_breaking=policy)
+            print("%-12s %-8s %5d %9d %9d %10.3f" % (name, policy, problem.get_cost_of_actions(path), stats.expanded,
+                                                     stats.generated, stats.total_time))
+
+
+def traced_call(func):
+    """
+    Call func() and return (result, peak bytes traced by tracemalloc).
+    """
+    tracemalloc.start()
+    try:
+        result = func()
+        return result, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def make_chain(node_store, length, state, actions):
+    """
+    Make a path of <length> nodes in <node_store>, all holding <state> and
+    cycling through <actions>, and return its last node.
+    """
+    node = node_store.make_node(state, None, 0, None)
+    for i in range(length):
+        node = node_store.make_node(state, actions[i % len(actions)], i + 1, node)
+    return node
+
+
+def benchmark_node_stores(num_nodes):
+    """
+    Compare the memory of Node objects with ArrayNodeStore: per node, on a
+    path of <num_nodes> nodes sharing one state, and as the peak of A* on the
+    Problem_set instances, and of breadth first search on those without a
+    heuristic (the others take it minutes).
+    """
+    board = Board(8, 8, 1, PieceList('small_set.txt'), (3, 3))
+    actions = board.get_legal_moves(0)
+    stores = [('Node', search.NodeStore), ('arrays', search.ArrayNodeStore)]
+    print("%-8s %9s %14s" % ('store', 'nodes', 'bytes per node'))
+    for (store_name, make_store) in stores:
+        _, peak = traced_call(lambda: make_chain(make_store(), num_nodes, board, actions))
+        print("%-8s %9d %14.1f" % (store_name, num_nodes, peak / num_nodes))
+
+    print()
+    print("%-12s %-6s %-8s %5s %9s %9s %10s" % ('problem', 'search', 'store', 'cost', 'generated', 'peak MB',
+                                               'seconds'))
+    searches = [('bfs', lambda problem, node_store: util.Queue(), search.DUPLICATES_ON_GENERATE),
+                ('astar', lambda problem, node_store: search.priority_frontier(problem, node_store=node_store),
+                 search.DUPLICATES_ON_EXPAND)]
+    for (name, make_problem, heuristic) in problem_set_instances():
+        for (search_name, make_frontier, duplicates) in searches[heuristic is not None:]:
+            for (store_name, make_store) in stores:
+                problem = make_problem()
+                node_store = make_store()
+                stats = search.SearchStats()
+                path, peak = traced_call(lambda: search.graph_search(
+                    problem, make_frontier(problem, node_store),
+                    priority=None if search_name == 'bfs' else search.estimated_cost,
+                    heuristic=None if search_name == 'bfs' else heuristic, duplicates=duplicates,
+                    node_store=node_store, stats=stats))
+                print("%-12s %-6s %-8s %5d %9d %9.2f %10.3f" % (name, search_name, store_name,
+                                                               problem.get_cost_of_actions(path), stats.generated,
+                                                               peak / 1e6, stats.total_time))
+
+
+def benchmark_replay_frontier(cache_sizes):
+    """
+    Compare A* (uniform cost search without a heuristic) keeping boards in
+    its frontier with A* on a ReplayNodeStore, for each LRU cache size, on
+    the Problem_set instances. The crossover is the smallest cache size at
+    which the replaying search takes as much memory as the plain one.
+    """
+    print("%-12s %6s %5s %9s %9s %9s %7s %10s %7s" % ('problem', 'cache', 'cost', 'expanded', 'replayed',
+                                                      'peak MB', 'memory', 'seconds', 'time'))
+    for (name, make_problem, heuristic) in problem_set_instances():
+        heuristic = heuristic or search.null_heuristic
+        problem = make_problem()
+        stats = search.SearchStats()
+        path, base_peak = traced_call(lambda: search.a_star_search(problem, heuristic, stats=stats))
+        base_time = stats.total_time
+        print("%-12s %6s %5d %9d %9s %9.2f %7s %10.3f %7s" % (name, 'boards', problem.get_cost_of_actions(path),
+                                                              stats.expanded, '-', base_peak / 1e6, '-',
+                                                              base_time, '-'))
+        crossover = None
+        for cache_size in cache_sizes:
+            problem = make_problem()
+            stats = search.SearchStats()
+            node_store = search.ReplayNodeStore(problem, cache_size)
+            path, peak = traced_call(lambda: search.a_star_search(problem, heuristic, stats=stats,
+                                                                  node_store=node_store))
+            if crossover is None and peak >= base_peak:
+                crossover = cache_size
+            print("%-12s %6d %5d %9d %9d %9.2f %6.2fx %10.3f %6.2fx" % (name, cache_size,
+                                                                     problem.get_cost_of_actions(path),
+                                                                     stats.expanded, node_store.replayed,
+                                                                     peak / 1e6, peak / base_peak,
+                                                                     stats.total_time, stats.total_time / base_time))
+        print("%-12s crossover: %s" % (name, 'cache of %d boards' % crossover if crossover else 'none measured'))
+
+
+def main():
+    parser = OptionParser(__doc__)
+    parser.add_option('-b', '--benchmark', dest='benchmark', type='choice',
+                      choices=['movegen', 'parallel', 'frontier', 'ties', 'nodes', 'replay', 'bidirectional'],
+                      default='movegen',
+                      help='the benchmark to run')
+    parser.add_option('-p', '--pieces', dest='pieces_file',
+                      help='the file to read for the list of pieces', default='valid_pieces.txt')
+    parser.add_option('-s', '--sizes', dest='sizes', type='int', nargs=3, default=(14, 20, 30),
+                      help='three board sizes to run the move generation benchmark on')
+    parser.add_option('-n', '--num-moves', dest='num_moves', type='int', default=40,
+                      help='number of random moves played before the last measurement')
+    parser.add_option('-r', '--repeat', dest='repeat', type='int', default=20,
+                      help='number of times each measurement is repeated')
+    parser.add_option('-w', '--workers', dest='workers', default='1,2,4,8',
+                      help='comma separated numbers of workers for the parallel search benchmark')
+    parser.add_option('-c', '--cache-sizes', dest='cache_sizes', default='1,16,256,1024,4096',
+                      help='comma separated sizes of the board cache for the replay frontier benchmark')
+    parser.add_option('--num-nodes', dest='num_nodes', type='int', default=100000,
+                      help='number of nodes made by the node store benchmark')
+    parser.add_option('-m', '--maze-sizes', dest='maze_sizes', default='51,101,201',
+                      help='comma separated sizes of the generated mazes for the bidirectional search benchmark')
+
+    options, _ = parser.parse_args()
+    piece_list = PieceList(options.pieces_file)
+
+    if options.benchmark == 'movegen':
+        benchmark_move_generation(options.sizes, piece_list, options.num_moves, options.repeat)
+    elif options.benchmark == 'parallel':
+        benchmark_parallel_search([int(workers) for workers in options.workers.split(',')])
+    elif options.benchmark == 'frontier':
+        benchmark_frontiers(options.repeat)
+    elif options.benchmark == 'ties':
+        benchmark_tie_breaking()
+    elif options.benchmark == 'nodes':
+        benchmark_node_stores(options.num_nodes)
+    elif options.benchmark == 'replay':
+        benchmark_replay_frontier([int(size) for size in options.cache_sizes.split(',')])
+    elif options.benchmark == 'bidirectional':
+        benchmark_bidirectional_search([int(size) for size in options.maze_sizes.split(',')])
+
+
+if __name__ == '__main__':
+    main()
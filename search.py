@@ -2,6 +2,19 @@
 In search.py, you will implement generic search algorithms
 """
 
+import array
+import collections
+import heapq
+import itertools
+import multiprocessing
+import os
+import pickle
+import queue
+import shutil
+import tempfile
+import time
+import traceback
+
 import util
 
 STATE = 0
@@ -46,6 +59,17 @@ class SearchProblem:
         """
         util.raiseNotDefined()
 
+    def iter_successors(self, state):
+        """
+        state: Search state
+
+        Optional: an iterator over the triples of get_successors, building
+        each successor only when the search asks for it, so a search that
+        stops early never builds the rest. The searches below take it over
+        get_successors; by default it iterates over get_successors
+        """
+        return iter(self.get_successors(state))
+
     def get_cost_of_actions(self, actions):
         """
         actions: A list of actions to take
@@ -55,8 +79,487 @@ class SearchProblem:
         """
         util.raiseNotDefined()
 
+    def get_predecessors(self, state):
+        """
+        state: Search state
+
+        Optional, for bidirectional searches: returns a list of triples,
+        (predecessor, action, stepCost), where 'action' leads from
+        'predecessor' to 'state' for 'stepCost'
+        """
+        util.raiseNotDefined()
+
+    def get_goal_states(self):
+        """
+        Optional, for bidirectional searches: returns the list of goal states
+        """
+        util.raiseNotDefined()
+
+    def get_actions(self, state):
+        """
+        state: Search state
+
+        Optional, for in-place and partial expansion searches: returns a
+        list of pairs (action, stepCost) for every action available in the
+        state, without building the successors
+        """
+        util.raiseNotDefined()
+
+    def get_result(self, state, action):
+        """
+        Optional, for partial expansion and parallel searches: returns the
+        successor 'action' leads to from 'state', leaving 'state' unchanged
+        """
+        util.raiseNotDefined()
+
+    def apply_action(self, state, action):
+        """
+        Optional, for in-place searches: performs 'action' on 'state' in place
+        and returns a record that undo_action takes to reverse it
+        """
+        util.raiseNotDefined()
+
+    def undo_action(self, state, record):
+        """
+        Optional, for in-place searches: reverses the action 'record' was
+        returned for by apply_action. Records are undone in reverse order
+        """
+        util.raiseNotDefined()
+
+    def state_key(self, state):
+        """
+        state: Search state
+
+        Returns a hashable key identifying the state, which stays valid after
+        the state itself is changed in place. Closed sets only keep a 64-bit
+        fingerprint of it: the key itself if it is an int, such as a Zobrist
+        key, or else its hash
+        """
+        return state
+
+    def encode_action(self, action):
+        """
+        Optional, for checkpoints and parallel searches: returns a picklable
+        form of 'action' that decode_action turns back into it
+        """
+        return action
+
+    def decode_action(self, code):
+        """
+        Optional, for checkpoints and parallel searches: the action 'code'
+        was returned for by encode_action
+        """
+        return code
+
+    def pack_node(self, state, actions):
+        """
+        state: Search state
+        actions: The actions that reach 'state' from the start state
+
+        Optional, for parallel searches: returns a picklable form of the pair
+        that unpack_node turns back into (state, actions)
+        """
+        return state, actions
+
+    def unpack_node(self, packed):
+        """
+        Optional, for parallel searches: the (state, actions) pair 'packed'
+        was returned for by pack_node
+        """
+        return packed
+
+
+DUPLICATES_ON_EXPAND = 'expand'
+DUPLICATES_ON_GENERATE = 'generate'
+NO_DUPLICATE_DETECTION = None
+
+# Tie breaking between frontier nodes of equal priority. No policy, TIES_LIFO
+# included, reproduces the arbitrary order util.PriorityQueue left ties in before
+# the indexed frontiers, so results changed with them: A* on the 10x10 cover
+# problem of Problem_set expands 31 nodes instead of 32, and A* on 5x5 corners
+# with valid_pieces returns a cost of 14 instead of 13, since
+# blokus_corners_heuristic is inadmissible (see the comment in it).
+TIES_LIFO = 'lifo'  # the last pushed first
+TIES_FIFO = 'fifo'  # the first pushed first
+TIES_HIGH_G = 'high-g'  # the deepest (highest cost from root) first, then LIFO
+TIES_LOW_H = 'low-h'  # the lowest heuristic first, then LIFO
+TIE_BREAKING_POLICIES = [TIES_LIFO, TIES_FIFO, TIES_HIGH_G, TIES_LOW_H]
+
+# Closed sets keep only 64-bit fingerprints of the state keys. Set this to
+# keep the keys as well and fail on a fingerprint collision, for debugging.
+VERIFY_CLOSED_SETS = False
+
+
+def closed_set(keys=()):
+    """
+    A new set of the state keys a search has seen, holding <keys>.
+    """
+    return util.FingerprintSet(keys, verify=VERIFY_CLOSED_SETS)
+
+
+class SearchStats:
+    """
+    What a search did, filled in by graph_search: nodes generated (the root
+    included) and expanded, successors dropped as duplicates, the largest
+    frontier and closed set, and the seconds spent building successors, in the
+    heuristic, in frontier pushes and pops, and in the whole search.
+    """
+
+    def __init__(self):
+        self.generated = 0
+        self.expanded = 0
+        self.duplicates = 0
+        self.peak_frontier = 0
+        self.peak_closed = 0
+        self.successor_time = 0.0
+        self.heuristic_time = 0.0
+        self.queue_time = 0.0
+        self.total_time = 0.0
+
+    def __str__(self):
+        return ("generated: %d, expanded: %d, duplicates: %d, peak frontier: %d, peak closed: %d\n"
+                "time: %.3fs (successors %.3fs, heuristic %.3fs, queue %.3fs)"
+                % (self.generated, self.expanded, self.duplicates, self.peak_frontier, self.peak_closed,
+                   self.total_time, self.successor_time, self.heuristic_time, self.queue_time))
+
+
+class SearchCheckpoint:
+    """
+    Saves the progress of graph_search to a file, every <nodes> expansions
+    and/or every <seconds> (every minute by default), so that
+    graph_search(resume_from=path) can go on from the last save after a
+    crash.
+
+    The nodes are kept in a ReplayNodeStore, so no state is ever written.
+    The file is a sequence of pickled blocks, each holding only what
+    changed since the block before:
+    - the nodes made (parent, action id, cost and key fingerprint)
+    - the new actions, through the problem's encode_action
+    - the frontier pushes (node, priority, tie) and pops
+    - the closed key fingerprints
+    - the counters of the stats, and the problem's own expanded count
+    Closed keys are saved as util.fingerprint values, so the state keys
+    must fingerprint the same in the resuming process (see fingerprint).
+    Writes only ever append a block, and a block cut short by a crash is
+    ignored when reading, and overwritten by the next write.
+    """
+
+    def __init__(self, path, nodes=None, seconds=60.0):
+        if nodes is None and seconds is None:
+            raise Exception('a checkpoint needs the nodes or seconds between writes')
+        self.path = path
+        self.nodes = nodes
+        self.seconds = seconds
+        self.written_nodes = 0
+        self.written_actions = 0
+        self.pushed_nodes = array.array('q')
+        self.pushed_priorities = array.array('d')
+        self.pushed_ties = array.array('d')
+        self.popped_nodes = array.array('q')
+        self.closed_keys = array.array('Q')
+        self.last_expanded = 0
+        self.last_time = time.perf_counter()
+        self.writes = 0
+
+    def begin(self):
+        "Starts the file over, for a new search"
+        open(self.path, 'wb').close()
+        self.last_time = time.perf_counter()
+
+    def pushed(self, node, priority, tie):
+        self.pushed_nodes.append(node)
+        self.pushed_priorities.append(priority)
+        self.pushed_ties.append(tie)
+
+    def popped(self, node):
+        self.popped_nodes.append(node)
+
+    def closed(self, key):
+        self.closed_keys.append(util.fingerprint(key))
 
-def depth_first_search(problem):
+    def due(self, stats):
+        "Returns True once the nodes or seconds between writes have passed"
+        return ((self.nodes is not None and stats.expanded - self.last_expanded >= self.nodes) or
+                (self.seconds is not None and time.perf_counter() - self.last_time >= self.seconds))
+
+    def write(self, node_store, stats, elapsed=0.0):
+        """
+        Appends what changed since the last write to the file. <elapsed> is
+        the time not yet added to stats.total_time.
+        """
+        start = self.written_nodes
+        counters = dict(vars(stats))
+        counters['total_time'] += elapsed
+        block = {'parents': node_store.parents[start:],
+                 'action_ids': node_store.action_ids[start:],
+                 'costs': node_store.costs[start:],
+                 'keys': node_store.keys[start:],
+                 'actions': [node_store.problem.encode_action(action)
+                             for action in node_store.actions[self.written_actions:]],
+                 'pushed': (self.pushed_nodes, self.pushed_priorities, self.pushed_ties),
+                 'popped': self.popped_nodes,
+                 'closed': self.closed_keys,
+                 'stats': counters,
+                 'expanded': getattr(node_store.problem, 'expanded', None)}
+        with open(self.path, 'ab') as checkpoint_file:
+            pickle.dump(block, checkpoint_file, pickle.HIGHEST_PROTOCOL)
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+
+        self.written_nodes = len(node_store)
+        self.written_actions = len(node_store.actions)
+        self.pushed_nodes = array.array('q')
+        self.pushed_priorities = array.array('d')
+        self.pushed_ties = array.array('d')
+        self.popped_nodes = array.array('q')
+        self.closed_keys = array.array('Q')
+        self.last_expanded = stats.expanded
+        self.last_time = time.perf_counter()
+        self.writes += 1
+
+    def resume(self, saved, path):
+        """
+        Carries on from the checkpoint <saved> read from <path>, appending
+        to its whole blocks, copied over first if <path> is another file.
+        """
+        if os.path.abspath(path) != os.path.abspath(self.path):
+            with open(path, 'rb') as saved_file, open(self.path, 'wb') as checkpoint_file:
+                checkpoint_file.write(saved_file.read(saved['size']))
+        with open(self.path, 'r+b') as checkpoint_file:
+            checkpoint_file.truncate(saved['size'])
+        self.written_nodes = len(saved['parents'])
+        self.written_actions = len(saved['actions'])
+        self.last_expanded = saved['stats']['expanded']
+        self.last_time = time.perf_counter()
+
+
+def read_checkpoint(path):
+    """
+    Reads the blocks a SearchCheckpoint wrote to <path> into one: a dict of
+    the same fields holding everything saved, plus the size of the file up
+    to the end of its last whole block. The stats and the problem's expanded
+    count are the last saved.
+    """
+    saved = {'parents': array.array('q'), 'action_ids': array.array('q'), 'costs': array.array('q'),
+             'keys': array.array('Q'), 'actions': [],
+             'pushed': (array.array('q'), array.array('d'), array.array('d')),
+             'popped': array.array('q'), 'closed': array.array('Q'), 'stats': None, 'expanded': None,
+             'size': 0}
+    with open(path, 'rb') as checkpoint_file:
+        while True:
+            try:
+                block = pickle.load(checkpoint_file)
+            except (EOFError, pickle.UnpicklingError, ValueError, IndexError):
+                # The end of the file, or a block cut short by a crash
+                break
+            for name in ('parents', 'action_ids', 'keys', 'actions', 'popped', 'closed'):
+                saved[name].extend(block[name])
+            costs = block['costs']
+            if costs.typecode != saved['costs'].typecode:
+                # The costs turned into floats since the blocks before
+                saved['costs'] = array.array('d', saved['costs'])
+                costs = array.array('d', costs)
+            saved['costs'].extend(costs)
+            for (pushed, new_pushed) in zip(saved['pushed'], block['pushed']):
+                pushed.extend(new_pushed)
+            saved['stats'] = block['stats']
+            saved['expanded'] = block['expanded']
+            saved['size'] = checkpoint_file.tell()
+    if saved['stats'] is None:
+        raise Exception('no checkpoint saved in ' + path)
+    return saved
+
+
+def iter_successors(problem, state, stats):
+    """
+    The (successor, action, stepCost) triples of <state>, from the problem's
+    iter_successors if it has one (problems that are not SearchProblems may
+    not) or else its get_successors. Counts the expansion in <stats>, along
+    with the time spent building successors as they are taken.
+    """
+    clock = time.perf_counter
+    start = clock()
+    if hasattr(problem, 'iter_successors'):
+        successors = problem.iter_successors(state)
+    else:
+        successors = iter(problem.get_successors(state))
+    stats.successor_time += clock() - start
+    stats.expanded += 1
+    while True:
+        start = clock()
+        successor = next(successors, None)
+        stats.successor_time += clock() - start
+        if successor is None:
+            return
+        yield successor
+
+
+def graph_search(problem, frontier, priority=None, heuristic=None, duplicates=DUPLICATES_ON_EXPAND,
+                 closed=None, node_store=None, stats=None, tie_breaking=TIES_LIFO, checkpoint=None,
+                 resume_from=None):
+    """
+    The search loop the searches below share. Nodes are goal tested when
+    they leave the frontier, and the path to the first goal found is returned.
+
+    frontier:   an empty util.Stack, util.Queue or util.PriorityQueue, or
+                anything with the same push/pop/isEmpty/len interface. A
+                util.IndexedPriorityQueue keyed by state key keeps one node
+                per state: successors already queued only replace their
+                node when reached for less
+    priority:   priority(cost, h) of a node in a priority frontier, where h
+                is its heuristic value (0 without a heuristic); None for
+                frontiers that take no priority
+    heuristic:  heuristic(state, problem), or None
+    duplicates: DUPLICATES_ON_EXPAND skips popped nodes whose state was
+                already expanded, DUPLICATES_ON_GENERATE drops successors
+                whose state was already generated, NO_DUPLICATE_DETECTION
+                searches the tree
+    closed:     the set of problem.state_key(state) seen so far, a new
+                closed_set by default
+    node_store: the NodeStore making the nodes, a NodeStore by default. The
+                frontier holds whatever it makes, the int ids of an
+                ArrayNodeStore for one
+    stats:      a SearchStats to fill in, if the caller wants the numbers
+    tie_breaking: TIES_HIGH_G or TIES_LOW_H to order nodes of equal
+                priority by their cost or heuristic, for an indexed frontier.
+                The insertion order (TIES_LIFO or TIES_FIFO) is the
+                frontier's own, see priority_frontier
+    checkpoint: a SearchCheckpoint to save the search to as it goes
+    resume_from: the path of a checkpoint to go on from, where the same
+                search saved it. The frontier and closed set are filled
+                from it, so they must start empty.
+
+    Checkpoints need the node_store to be a ReplayNodeStore (one is made if
+    none is given), and so the problem's get_result.
+    """
+    if (checkpoint is not None or resume_from is not None) and node_store is None:
+        node_store = ReplayNodeStore(problem)
+    if node_store is None:
+        node_store = NodeStore()
+    if closed is None:
+        closed = closed_set()
+    if stats is None:
+        stats = SearchStats()
+    clock = time.perf_counter
+    search_start = clock()
+
+    indexed = hasattr(frontier, 'push_or_decrease')
+
+    def enqueue(node, value, tie):
+        if priority is None:
+            frontier.push(node)
+        elif not indexed:
+            frontier.push(node, value)
+        elif not frontier.push_or_decrease(node, value, tie):
+            return False
+        return True
+
+    def push(node, state, cost):
+        value = tie = 0
+        if priority is not None:
+            h = 0
+            if heuristic is not None:
+                start = clock()
+                h = heuristic(state, problem)
+                stats.heuristic_time += clock() - start
+            if tie_breaking == TIES_HIGH_G:
+                tie = -cost
+            elif tie_breaking == TIES_LOW_H:
+                tie = h
+            value = priority(cost, h)
+        start = clock()
+        added = enqueue(node, value, tie)
+        stats.queue_time += clock() - start
+        stats.generated += 1
+        if not added:
+            stats.duplicates += 1
+            node_store.release_state(node)
+            return
+        if indexed and getattr(frontier, 'replaced', None) is not None:
+            node_store.release_state(frontier.replaced)
+        if checkpoint is not None:
+            checkpoint.pushed(node, value, tie)
+
+    def close(key):
+        closed.add(key)
+        if checkpoint is not None:
+            checkpoint.closed(key)
+
+    try:
+        first_state = problem.get_start_state()
+        if resume_from is None:
+            if checkpoint is not None:
+                checkpoint.begin()
+            if duplicates == DUPLICATES_ON_GENERATE:
+                close(problem.state_key(first_state))
+            push(node_store.make_node(first_state, None, 0, None), first_state, 0)
+        else:
+            saved = read_checkpoint(resume_from)
+            node_store.restore(first_state, saved['parents'], saved['action_ids'], saved['costs'], saved['keys'],
+                               [problem.decode_action(code) for code in saved['actions']])
+            popped = set(saved['popped'])
+            for (node, value, tie) in zip(*saved['pushed']):
+                if node not in popped:
+                    enqueue(node, value, tie)
+            for key in saved['closed']:
+                # A fingerprint is its own fingerprint
+                closed.add(key)
+            vars(stats).update(saved['stats'])
+            if saved['expanded'] is not None:
+                # The problem counts its expansions too, and callers report that count
+                problem.expanded = saved['expanded']
+            if checkpoint is not None:
+                checkpoint.resume(saved, resume_from)
+        stats.peak_frontier = max(stats.peak_frontier, len(frontier))
+
+        while not frontier.isEmpty():
+            start = clock()
+            node = frontier.pop()
+            stats.queue_time += clock() - start
+            if checkpoint is not None:
+                checkpoint.popped(node)
+            state = node_store.get_state(node)
+
+            if duplicates == DUPLICATES_ON_EXPAND:
+                key = problem.state_key(state)
+                if key in closed:
+                    stats.duplicates += 1
+                    node_store.release_state(node)
+                    continue
+            if problem.is_goal_state(state):
+                return node_store.get_path(node)
+            if duplicates == DUPLICATES_ON_EXPAND:
+                close(key)
+
+            cost = node_store.get_cost(node)
+            for (new_state, action, step_cost) in iter_successors(problem, state, stats):
+                if duplicates == DUPLICATES_ON_GENERATE:
+                    key = problem.state_key(new_state)
+                    if key in closed:
+                        stats.duplicates += 1
+                        continue
+                    close(key)
+                elif indexed and duplicates == DUPLICATES_ON_EXPAND and problem.state_key(new_state) in closed:
+                    # The frontier keeps one node per state, so expanded
+                    # states must not come back into it.
+                    stats.duplicates += 1
+                    continue
+                new_cost = cost + step_cost
+                push(node_store.make_node(new_state, action, new_cost, node), new_state, new_cost)
+            node_store.release_state(node)
+
+            stats.peak_frontier = max(stats.peak_frontier, len(frontier))
+            stats.peak_closed = max(stats.peak_closed, len(closed))
+            if checkpoint is not None and checkpoint.due(stats):
+                checkpoint.write(node_store, stats, clock() - search_start)
+
+        return FAILURE
+    finally:
+        stats.peak_closed = max(stats.peak_closed, len(closed))
+        stats.total_time += clock() - search_start
+
+
+def depth_first_search(problem, stats=None):
     """
     Search the deepest nodes in the search tree first.
 
@@ -66,95 +569,281 @@ def depth_first_search(problem):
     To get started, you might want to try some of these simple commands to
     understand the search problem that is being passed in:
     """
-    fringe = util.Stack()
-    current_state = problem.get_start_state()
-    visited = set()
+    return graph_search(problem, util.Stack(), duplicates=DUPLICATES_ON_EXPAND, stats=stats)
+
+
+def in_place_depth_first_search(problem, stats=None):
+    """
+    Search the deepest nodes in the search tree first, like depth_first_search,
+    but with a single state that is changed in place through the problem's
+    apply_action/undo_action instead of building every successor.
+
+    Only the current path (its actions, undo records and untried actions) and
+    the keys of the visited states are kept, so no more than depth states'
+    worth of data is ever alive at once. The untried actions count as the
+    frontier in stats, and get_actions as the successor function.
+    """
+    if stats is None:
+        stats = SearchStats()
+    clock = time.perf_counter
+    search_start = clock()
+
+    def get_actions(state):
+        start = clock()
+        actions = problem.get_actions(state)
+        stats.successor_time += clock() - start
+        stats.expanded += 1
+        return actions
+
+    state = problem.get_start_state()
+    stats.generated += 1
+    if problem.is_goal_state(state):
+        stats.total_time += clock() - search_start
+        return []
+    visited = closed_set([problem.state_key(state)])
     path = list()
-    counter = [1]
+    records = list()
+    # untried[i] holds the actions left to try after path[:i]
+    untried = [get_actions(state)]
+    frontier_size = len(untried[-1])
+    stats.peak_frontier = frontier_size
 
-    while True:
-        # Check if found goal.
-        if problem.is_goal_state(current_state):
-            return path
-        elif current_state not in visited:
-            # New unvisited state so add all successors to fringe.
-            visited.add(current_state)
-            successors = problem.get_successors(current_state)
-            num_successors = len(successors)
-            if num_successors > 0:
-                counter.append(num_successors)
-                path.append(None)  # Placeholder for current's successors' moves.
-                for triple in successors:
-                    fringe.push(triple[:2])
-
-        # Check if we've exhausted the search
-        if fringe.isEmpty():
-            return FAILURE
+    try:
+        while untried:
+            if not untried[-1]:
+                # Exhausted this state, climb back up the tree.
+                untried.pop()
+                if records:
+                    problem.undo_action(state, records.pop())
+                    path.pop()
+                continue
+
+            # Like depth_first_search, try the last successor first.
+            action, step_cost = untried[-1].pop()
+            frontier_size -= 1
+            records.append(problem.apply_action(state, action))
+            path.append(action)
+            stats.generated += 1
+            if problem.is_goal_state(state):
+                return path[:]
+
+            key = problem.state_key(state)
+            if key in visited:
+                stats.duplicates += 1
+                problem.undo_action(state, records.pop())
+                path.pop()
+            else:
+                visited.add(key)
+                untried.append(get_actions(state))
+                frontier_size += len(untried[-1])
+                stats.peak_frontier = max(stats.peak_frontier, frontier_size)
 
-        # Proceed to next node.
-        current_state, current_move = fringe.pop()
-        # Climb back up tree if necessary.
-        if counter[-1] == 0:
-            i = -1
-            while counter[i - 1] == 0:
-                i -= 1
-            del path[i:]
-            del counter[i:]
-        # Update breadth counter and change placeholder move with correct one.
-        counter[-1] -= 1
-        path[-1] = current_move
+        return FAILURE
+    finally:
+        # Hand the start state back unchanged.
+        while records:
+            problem.undo_action(state, records.pop())
+        stats.peak_closed = len(visited)
+        stats.total_time += clock() - search_start
 
 
-def breadth_first_search(problem):
+def breadth_first_search(problem, stats=None):
     """
     Search the shallowest nodes in the search tree first.
     """
-    "*** YOUR CODE HERE ***"
+    return graph_search(problem, util.Queue(), duplicates=DUPLICATES_ON_GENERATE, stats=stats)
+
+
+def external_breadth_first_search(problem, stats=None, window=100000, directory=None):
+    """
+    Breadth first search that keeps its layers on disk rather than in
+    memory, so that it can enumerate state spaces larger than the RAM.
+
+    Each layer is a file of (fingerprint, packed node) records, sorted by
+    the 64-bit fingerprint of the state key, with nodes packed by the
+    problem's pack_node and rebuilt by its unpack_node. The successors of a
+    layer are collected <window> at a time, sorted and written out as runs.
+    The runs are then merged into the next layer, dropping the states seen
+    in the layer or any layer before, whose fingerprints are kept in one
+    more sorted file. Only the window and a record per run are in memory
+    at a time. The files go in a temporary directory in <directory>.
+
+    The layers are goal tested as they are read, so the path returned has
+    the fewest actions, like breadth_first_search's. The largest layer
+    counts as the frontier in stats, and disk sorting and merging as the
+    queue time.
+    """
+    if stats is None:
+        stats = SearchStats()
+    clock = time.perf_counter
+    search_start = clock()
+    work = tempfile.mkdtemp(prefix='bfs-', dir=directory)
+    try:
+        first_state = problem.get_start_state()
+        fp = util.fingerprint(problem.state_key(first_state))
+        layer = os.path.join(work, 'layer')
+        _write_records(layer, [(fp, problem.pack_node(first_state, []))])
+        seen = os.path.join(work, 'seen')
+        with open(seen, 'wb') as seen_file:
+            array.array('Q', [fp]).tofile(seen_file)
+        stats.generated = stats.peak_frontier = stats.peak_closed = 1
+        depth = 0
+
+        while True:
+            runs = []
+            window_records = []
+            for (_, packed) in _read_records(layer):
+                state, actions = problem.unpack_node(packed)
+                if problem.is_goal_state(state):
+                    return list(actions)
+                for (new_state, action, step_cost) in iter_successors(problem, state, stats):
+                    window_records.append((util.fingerprint(problem.state_key(new_state)),
+                                           problem.pack_node(new_state, list(actions) + [action])))
+                    if len(window_records) >= window:
+                        runs.append(_write_run(work, len(runs), window_records, stats))
+                        window_records = []
+            if window_records:
+                runs.append(_write_run(work, len(runs), window_records, stats))
+            if not runs:
+                return FAILURE
+
+            # Merge the runs into the next layer, and its fingerprints into
+            # the ones seen so far.
+            start = clock()
+            depth += 1
+            next_layer = os.path.join(work, 'layer-%d' % depth)
+            next_seen = os.path.join(work, 'seen-%d' % depth)
+            size = 0
+            with open(next_layer, 'wb') as layer_file, open(next_seen, 'wb') as seen_file:
+                seen_fps = _read_fingerprints(seen)
+                seen_fp = next(seen_fps, None)
+                merged = array.array('Q')
+                last_fp = None
+                for record in heapq.merge(*[_read_records(run) for run in runs], key=_record_fingerprint):
+                    fp = record[0]
+                    while seen_fp is not None and seen_fp < fp:
+                        merged.append(seen_fp)
+                        seen_fp = next(seen_fps, None)
+                    if fp == last_fp or fp == seen_fp:
+                        stats.duplicates += 1
+                        continue
+                    last_fp = fp
+                    pickle.dump(record, layer_file, pickle.HIGHEST_PROTOCOL)
+                    merged.append(fp)
+                    size += 1
+                    if len(merged) >= _FINGERPRINT_CHUNK:
+                        merged.tofile(seen_file)
+                        merged = array.array('Q')
+                while seen_fp is not None:
+                    merged.append(seen_fp)
+                    seen_fp = next(seen_fps, None)
+                merged.tofile(seen_file)
+            for path in runs + [layer, seen]:
+                os.remove(path)
+            layer, seen = next_layer, next_seen
+            stats.queue_time += clock() - start
+            stats.generated += size
+            stats.peak_frontier = max(stats.peak_frontier, size)
+            stats.peak_closed += size
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+        stats.total_time += clock() - search_start
+
+
+_FINGERPRINT_CHUNK = 8192
+
 
-    fringe = util.Queue()
-    first_state = problem.get_start_state()
-    visited = {first_state}
-    cur_node = Node((first_state, None, 0), None)
-    fringe.push(cur_node)
+def _read_fingerprints(path):
+    "Yields the fingerprints written to the file <path> as 64-bit words"
+    with open(path, 'rb') as fingerprint_file:
+        while True:
+            chunk = array.array('Q')
+            try:
+                chunk.fromfile(fingerprint_file, _FINGERPRINT_CHUNK)
+            except EOFError:
+                # The last chunk holds what was left
+                yield from chunk
+                return
+            yield from chunk
 
-    while not fringe.isEmpty():
-        cur_node = fringe.pop()
-        visited.add(cur_node)
-        if problem.is_goal_state(cur_node.get_state()):
-            return get_path(cur_node)
-        successors = problem.get_successors(cur_node.get_state())
-        for triple in successors:
-            if triple[STATE] not in visited:
-                visited.add(triple[STATE])
-                fringe.push(Node(triple, cur_node))
 
-    return FAILURE
+def _record_fingerprint(record):
+    return record[0]
 
 
-def uniform_cost_search(problem):
+def _write_records(path, records):
+    with open(path, 'wb') as records_file:
+        for record in records:
+            pickle.dump(record, records_file, pickle.HIGHEST_PROTOCOL)
+
+
+def _read_records(path):
+    "Yields the records pickled one after the other in the file <path>"
+    with open(path, 'rb') as records_file:
+        while True:
+            try:
+                yield pickle.load(records_file)
+            except EOFError:
+                return
+
+
+def _write_run(work, index, records, stats):
+    """
+    Writes <records> sorted by fingerprint, without repeats, to a new run
+    file of external_breadth_first_search, and returns its path.
+    """
+    start = time.perf_counter()
+    records.sort(key=_record_fingerprint)
+    path = os.path.join(work, 'run-%d' % index)
+    with open(path, 'wb') as run_file:
+        last_fp = None
+        for record in records:
+            if record[0] == last_fp:
+                stats.duplicates += 1
+                continue
+            last_fp = record[0]
+            pickle.dump(record, run_file, pickle.HIGHEST_PROTOCOL)
+    stats.queue_time += time.perf_counter() - start
+    return path
+
+
+def uniform_cost_search(problem, stats=None, tie_breaking=TIES_LIFO, node_store=None, checkpoint=None,
+                        resume_from=None):
     """
     Search the node of least total cost first.
-        Fringe is a priority queue of tuples: (successor, action, action cost, parent ID)
-        prioritized by cost from root.
-    """
-    "*** YOUR CODE HERE ***"
-    fringe = util.PriorityQueue()
-    first_state = problem.get_start_state()
-    visited = {first_state}
-    cur_node = Node((first_state, None, 0), None)
-    fringe.push(cur_node, 0)
-    while not fringe.isEmpty():
-        cur_node = fringe.pop()
-        if problem.is_goal_state(cur_node.get_state()):
-            return get_path(cur_node)
-        successors = problem.get_successors(cur_node.get_state())
-        for (new_state, action, step_cost) in successors:
-            if new_state not in visited:
-                visited.add(new_state)
-                fringe.push(Node((new_state, action, step_cost + cur_node.get_cost()), cur_node),
-                            step_cost + cur_node.get_cost())
-
-    return FAILURE
+        Fringe is a bucket priority queue holding one node per state,
+        prioritized by cost from root; a state reached for less than its
+        queued node has its node replaced.
+    See graph_search for node_store, checkpoint and resume_from.
+    """
+    if (checkpoint is not None or resume_from is not None) and node_store is None:
+        node_store = ReplayNodeStore(problem)
+    return graph_search(problem, priority_frontier(problem, tie_breaking, node_store), priority=path_cost,
+                        duplicates=DUPLICATES_ON_EXPAND, node_store=node_store, stats=stats,
+                        tie_breaking=tie_breaking, checkpoint=checkpoint, resume_from=resume_from)
+
+
+def priority_frontier(problem, tie_breaking=TIES_LIFO, node_store=None):
+    """
+    The frontier of uniform_cost_search and a_star_search: one node per
+    state of <problem>, in integer priority buckets while priorities are
+    integers, popping equal nodes as <tie_breaking> orders them. Pass the
+    node_store graph_search will use if it is not a NodeStore.
+    """
+    order = util.FIFO if tie_breaking == TIES_FIFO else util.LIFO
+    if node_store is None:
+        return util.BucketPriorityQueue(lambda node: problem.state_key(node.get_state()), order)
+    if hasattr(node_store, 'get_key'):
+        return util.BucketPriorityQueue(node_store.get_key, order)
+    return util.BucketPriorityQueue(lambda node: problem.state_key(node_store.get_state(node)), order)
+
+
+def path_cost(cost, h):
+    return cost
+
+
+def estimated_cost(cost, h):
+    return cost + h
 
 
 def null_heuristic(state, problem=None):
@@ -165,34 +854,798 @@ def null_heuristic(state, problem=None):
     return 0
 
 
-def a_star_search(problem, heuristic=null_heuristic):
+def a_star_search(problem, heuristic=null_heuristic, stats=None, tie_breaking=TIES_LIFO, node_store=None,
+                  checkpoint=None, resume_from=None):
     """
-    Search the node that has the lowest combined cost and heuristic first.
+    Search the node that has the lowest combined cost and heuristic first,
+    breaking ties between equal f as <tie_breaking> says. A ReplayNodeStore
+    as the node_store keeps the frontier down to the moves of its nodes.
+    See graph_search for checkpoint and resume_from.
     """
-    # print("Start:", problem.get_start_state().state)
-    # print("Is the start a goal?", problem.is_goal_state(problem.get_start_state()))
-    # print("Start's successors:", problem.get_successors(problem.get_start_state()))
+    if (checkpoint is not None or resume_from is not None) and node_store is None:
+        node_store = ReplayNodeStore(problem)
+    return graph_search(problem, priority_frontier(problem, tie_breaking, node_store), priority=estimated_cost,
+                        heuristic=heuristic, duplicates=DUPLICATES_ON_EXPAND, node_store=node_store, stats=stats,
+                        tie_breaking=tie_breaking, checkpoint=checkpoint, resume_from=resume_from)
 
-    fringe = util.PriorityQueue()
-    first_state = problem.get_start_state()
-    visited = set()
-    fringe.push(Node((first_state, None, 0), None), 0)
 
-    while not fringe.isEmpty():
-        current_node = fringe.pop()
-        current_state = current_node.get_state()
-        if current_state not in visited:
-            if problem.is_goal_state(current_state):
-                return get_path(current_node)
+def bidirectional_breadth_first_search(problem, stats=None):
+    """
+    Breadth first search from the start and, backwards through the
+    problem's get_predecessors, from its goal states, a layer at a time
+    from the side with the smaller frontier, until the two meet.
 
-            visited.add(current_state)
-            successors = problem.get_successors(current_state)
+    Returns a path with the fewest actions: the layer the sides meet in is
+    expanded to the end, and the shortest path through the states it
+    reached on the other side is taken.
+    """
+    if stats is None:
+        stats = SearchStats()
+    clock = time.perf_counter
+    search_start = clock()
+    try:
+        first_state = problem.get_start_state()
+        stats.generated += 1
+        if problem.is_goal_state(first_state):
+            return []
+        forward = _BidirectionalSide(problem, [first_state], problem.get_successors)
+        backward = _BidirectionalSide(problem, problem.get_goal_states(), problem.get_predecessors)
+        stats.generated += len(backward.layer)
+
+        while forward.layer and backward.layer:
+            side, other = (forward, backward) if len(forward.layer) <= len(backward.layer) else (backward, forward)
+            best = None
+            layer = side.layer
+            side.layer = []
+            for state in layer:
+                key = problem.state_key(state)
+                depth = side.reached[key][0]
+                start = clock()
+                successors = side.expand(state)
+                stats.successor_time += clock() - start
+                stats.expanded += 1
+                for (new_state, action, _) in successors:
+                    new_key = problem.state_key(new_state)
+                    if new_key in side.reached:
+                        stats.duplicates += 1
+                        continue
+                    side.reached[new_key] = (depth + 1, key, action)
+                    side.layer.append(new_state)
+                    stats.generated += 1
+                    if new_key in other.reached:
+                        length = depth + 1 + other.reached[new_key][0]
+                        if best is None or length < best[0]:
+                            best = (length, new_key)
+            stats.peak_frontier = max(stats.peak_frontier, len(forward.layer) + len(backward.layer))
+            stats.peak_closed = max(stats.peak_closed, len(forward.reached) + len(backward.reached))
+            if best is not None:
+                return _join_paths(forward, backward, best[1])
+        return FAILURE
+    finally:
+        stats.total_time += clock() - search_start
+
+
+def bidirectional_a_star_search(problem, heuristic=null_heuristic, backward_heuristic=null_heuristic, stats=None):
+    """
+    Front-to-end bidirectional A*: an A* search from the start, with
+    heuristic(state, problem) estimating the cost to a goal, and one from
+    the goal states through the problem's get_predecessors, with
+    backward_heuristic(state, problem) estimating the cost from the start.
+    The side with the smaller frontier expands next.
+
+    Every state reached by both sides is a path, and the cheapest one so far
+    is kept. The search stops when its cost is at most the lowest f of
+    either frontier, as no path left to find can be cheaper, which holds
+    for admissible heuristics. Both heuristics must be consistent for the
+    sides to never reopen a state.
+    """
+    if stats is None:
+        stats = SearchStats()
+    clock = time.perf_counter
+    search_start = clock()
+    try:
+        first_state = problem.get_start_state()
+        if problem.is_goal_state(first_state):
+            stats.generated += 1
+            return []
+        forward = _BidirectionalSide(problem, [first_state], problem.get_successors, heuristic, stats)
+        backward = _BidirectionalSide(problem, problem.get_goal_states(), problem.get_predecessors,
+                                      backward_heuristic, stats)
+        best_cost = float('inf')
+        best_key = None
+
+        while not forward.open.isEmpty() and not backward.open.isEmpty():
+            if best_cost <= max(forward.open.peek_priority(), backward.open.peek_priority()):
+                break
+            side, other = (forward, backward) if len(forward.open) <= len(backward.open) else (backward, forward)
+            start = clock()
+            key = side.open.pop()
+            stats.queue_time += clock() - start
+            state = side.states.pop(key)
+            side.closed.add(key)
+            cost = side.reached[key][0]
+
+            start = clock()
+            successors = side.expand(state)
+            stats.successor_time += clock() - start
+            stats.expanded += 1
             for (new_state, action, step_cost) in successors:
-                new_cost = step_cost + current_node.get_cost()
-                priority = new_cost + heuristic(new_state, problem)
-                fringe.push(Node((new_state, action, new_cost), current_node), priority)
+                new_key = problem.state_key(new_state)
+                new_cost = cost + step_cost
+                if new_key in side.closed or new_cost >= side.reached.get(new_key, (float('inf'),))[0]:
+                    stats.duplicates += 1
+                    continue
+                side.push(new_state, new_key, new_cost, (key, action))
+                if new_key in other.reached and new_cost + other.reached[new_key][0] < best_cost:
+                    best_cost = new_cost + other.reached[new_key][0]
+                    best_key = new_key
+            stats.peak_frontier = max(stats.peak_frontier, len(forward.open) + len(backward.open))
+            stats.peak_closed = max(stats.peak_closed, len(forward.closed) + len(backward.closed))
+
+        if best_key is None:
+            return FAILURE
+        return _join_paths(forward, backward, best_key)
+    finally:
+        stats.total_time += clock() - search_start
+
+
+class _BidirectionalSide:
+    """
+    One side of a bidirectional search. reached maps the key of every state
+    the side has reached to (cost or depth, parent key, action); for the backward
+    side the parent is the state the action leads to. The breadth first
+    search keeps the states of its current layer in layer, and A* keeps
+    its frontier in open (state keys by f) and their states in states.
+    """
+
+    def __init__(self, problem, roots, expand, heuristic=None, stats=None):
+        self.problem = problem
+        self.expand = expand
+        self.heuristic = heuristic
+        self.stats = stats
+        self.reached = {}
+        self.layer = list(roots)
+        self.open = util.IndexedPriorityQueue()
+        self.states = {}
+        self.closed = set()
+        for root in roots:
+            if heuristic is None:
+                self.reached[problem.state_key(root)] = (0, None, None)
+            else:
+                self.push(root, problem.state_key(root), 0, (None, None))
+
+    def push(self, state, key, cost, parent):
+        stats = self.stats
+        clock = time.perf_counter
+        start = clock()
+        h = self.heuristic(state, self.problem)
+        stats.heuristic_time += clock() - start
+        self.reached[key] = (cost,) + parent
+        self.states[key] = state
+        start = clock()
+        self.open.push_or_decrease(key, cost + h, -cost)
+        stats.queue_time += clock() - start
+        stats.generated += 1
+
+    def path_to(self, key):
+        "The actions between the root and the state of <key>, from the root on"
+        actions = []
+        (_, parent, action) = self.reached[key]
+        while parent is not None:
+            actions.append(action)
+            (_, parent, action) = self.reached[parent]
+        return actions
+
+
+def _join_paths(forward, backward, key):
+    """
+    The path from the start to a goal through the state of <key>, reached
+    by both sides of a bidirectional search.
+    """
+    path = forward.path_to(key)
+    path.reverse()
+    return path + backward.path_to(key)
+
+
+def partial_expansion_a_star_search(problem, heuristic=null_heuristic, stats=None, tie_breaking=TIES_LIFO):
+    """
+    Partial expansion A* (PEA*): a node queued with value F only queues
+    its successors of f <= F when expanded. The others are dropped, and
+    the node is queued again with the lowest f among them. Only their f,
+    action and step cost are kept, so when the node comes back with a
+    higher F just the successors of that f are built again, without
+    listing the actions or calling the heuristic a second time. Most
+    successors of a Blokus board are never popped by A*, so this keeps
+    far fewer boards alive.
+
+    Needs the problem's get_actions and get_result. Expanding a node in
+    stats means listing its actions, which happens once per node.
+    """
+    if stats is None:
+        stats = SearchStats()
+    clock = time.perf_counter
+    search_start = clock()
+    frontier = priority_frontier(problem, tie_breaking)
+    queued = {}  # state key -> (F, cost) of its queued node
+    dropped = {}  # state key -> (node, h, [(f, action, step cost)] by decreasing f) of nodes queued again
+    closed = closed_set()
+
+    def evaluate(state):
+        start = clock()
+        h = heuristic(state, problem)
+        stats.heuristic_time += clock() - start
+        return h
+
+    def push(node, key, f, h):
+        tie = -node.get_cost() if tie_breaking == TIES_HIGH_G else h if tie_breaking == TIES_LOW_H else 0
+        start = clock()
+        frontier.push_or_decrease(node, f, tie)
+        stats.queue_time += clock() - start
+        queued[key] = (f, node.get_cost())
+
+    def build(node, action, step_cost):
+        "The successor state and cost of <action>, if its state is not closed or queued for less"
+        new_cost = node.get_cost() + step_cost
+        start = clock()
+        new_state = problem.get_result(node.get_state(), action)
+        stats.successor_time += clock() - start
+        new_key = problem.state_key(new_state)
+        if new_key in closed or (new_key in queued and queued[new_key][1] <= new_cost):
+            stats.duplicates += 1
+            return None, None, None
+        return new_state, new_key, new_cost
+
+    try:
+        first_state = problem.get_start_state()
+        h = evaluate(first_state)
+        push(Node((first_state, None, 0), None), problem.state_key(first_state), h, h)
+        stats.generated += 1
+
+        while not frontier.isEmpty():
+            start = clock()
+            node = frontier.pop()
+            stats.queue_time += clock() - start
+            state = node.get_state()
+            key = problem.state_key(state)
+            node_f, cost = queued.pop(key)
+            if problem.is_goal_state(state):
+                return get_path(node)
+
+            entry = dropped.pop(key, None)
+            if entry is not None and entry[0] is node:
+                # Queued again: build only the dropped successors of f <= F
+                h, successors = entry[1], entry[2]
+                taken = []
+                while successors and successors[-1][0] <= node_f:
+                    taken.append(successors.pop())
+                for (f, action, step_cost) in reversed(taken):
+                    new_state, new_key, new_cost = build(node, action, step_cost)
+                    if new_state is not None:
+                        push(Node((new_state, action, new_cost), node), new_key, f, f - new_cost)
+                        stats.generated += 1
+            else:
+                h = node_f - cost
+                start = clock()
+                actions = problem.get_actions(state)
+                stats.successor_time += clock() - start
+                stats.expanded += 1
+                successors = []
+                for (action, step_cost) in actions:
+                    new_state, new_key, new_cost = build(node, action, step_cost)
+                    if new_state is None:
+                        continue
+                    new_h = evaluate(new_state)
+                    f = new_cost + new_h
+                    if f > node_f:
+                        successors.append((f, action, step_cost))
+                        continue
+                    push(Node((new_state, action, new_cost), node), new_key, f, new_h)
+                    stats.generated += 1
+                # Stable, so successors of equal f are built in the problem's order
+                successors.sort(key=lambda successor: -successor[0])
+
+            if successors:
+                dropped[key] = (node, h, successors)
+                push(node, key, successors[-1][0], h)
+            else:
+                closed.add(key)
+            stats.peak_frontier = max(stats.peak_frontier, len(frontier))
+            stats.peak_closed = max(stats.peak_closed, len(closed))
+
+        return FAILURE
+    finally:
+        stats.total_time += clock() - search_start
+
+
+def ida_star(problem, heuristic=null_heuristic, transposition_size=0, stats=None):
+    """
+    Iterative deepening A*: depth first searches bounded by f = cost + h,
+    each bound the smallest f that went over the one before.
+
+    Only the current path and the untried actions of each state on it are
+    kept, so memory grows with the solution depth instead of with the nodes
+    generated. Like depth_first_search, the last action is tried first, and
+    a successor is only built when its action is tried. The untried actions
+    count as the frontier in stats, and get_actions as the successor
+    function.
+    The states on the current path are never entered again. With a
+    transposition_size, up to that many states are also remembered with the
+    cheapest cost they were reached at in the current iteration, and not
+    expanded again when reached at the same cost or more.
+
+    Needs the problem's get_actions and get_result.
+    """
+    if stats is None:
+        stats = SearchStats()
+    clock = time.perf_counter
+    search_start = clock()
+    try:
+        first_state = problem.get_start_state()
+        stats.generated += 1
+        start = clock()
+        bound = heuristic(first_state, problem)
+        stats.heuristic_time += clock() - start
+        while True:
+            path, bound = _bounded_depth_first_search(problem, heuristic, first_state, bound,
+                                                       transposition_size, stats)
+            if path is not None:
+                return path
+            if bound == float('inf'):
+                return FAILURE
+    finally:
+        stats.total_time += clock() - search_start
+
+
+def _bounded_depth_first_search(problem, heuristic, first_state, bound, transposition_size, stats):
+    """
+    One iteration of ida_star. Returns the path to a goal within <bound>, or
+    None and the smallest f of the nodes cut off by <bound>.
+    """
+    clock = time.perf_counter
+    if problem.is_goal_state(first_state):
+        return [], bound
+
+    def get_actions(state):
+        start = clock()
+        actions = problem.get_actions(state)
+        stats.successor_time += clock() - start
+        stats.expanded += 1
+        return actions
+
+    next_bound = float('inf')
+    path = list()
+    states = [first_state]
+    keys = [problem.state_key(first_state)]
+    on_path = {keys[0]}
+    table = {}
+    # untried[i] holds (cost, actions left to try) in states[i], after path[:i]
+    untried = [(0, get_actions(first_state))]
+    frontier_size = len(untried[-1][1])
+    stats.peak_frontier = max(stats.peak_frontier, frontier_size)
+
+    while untried:
+        cost, actions = untried[-1]
+        if not actions:
+            # Exhausted this state, climb back up the tree.
+            untried.pop()
+            states.pop()
+            if path:
+                path.pop()
+                on_path.discard(keys.pop())
+            continue
+
+        # Like depth_first_search, try the last action first.
+        action, step_cost = actions.pop()
+        frontier_size -= 1
+        start = clock()
+        new_state = problem.get_result(states[-1], action)
+        stats.successor_time += clock() - start
+        stats.generated += 1
+        new_cost = cost + step_cost
+        start = clock()
+        f = new_cost + heuristic(new_state, problem)
+        stats.heuristic_time += clock() - start
+        if f > bound:
+            next_bound = min(next_bound, f)
+            continue
+
+        key = problem.state_key(new_state)
+        if key in on_path or table.get(key, float('inf')) <= new_cost:
+            stats.duplicates += 1
+            continue
+        if key in table or len(table) < transposition_size:
+            table[key] = new_cost
+
+        path.append(action)
+        if problem.is_goal_state(new_state):
+            return path, bound
+        states.append(new_state)
+        keys.append(key)
+        on_path.add(key)
+        untried.append((new_cost, get_actions(new_state)))
+        frontier_size += len(untried[-1][1])
+        stats.peak_frontier = max(stats.peak_frontier, frontier_size)
+        stats.peak_closed = max(stats.peak_closed, len(on_path) + len(table))
+
+    return None, next_bound
+
+
+class AnytimeRepairingAStar:
+    """
+    Anytime repairing A* (ARA*). It runs weighted A* searches, with f = g +
+    weight * h, starting from a high weight, which finds a first path fast.
+    After each search it lowers the weight and searches again, reusing the
+    costs found so far. Only the open nodes, and the closed states whose
+    cost has since improved, are carried over, so no state is re-expanded
+    unless a cheaper path to it was found.
 
-    return FAILURE
+    Between searches, path holds the best path found so far, cost its cost,
+    and bound a factor its cost is within of the optimal cost (1 once it is
+    proven optimal).
+    """
+
+    def __init__(self, problem, heuristic=null_heuristic, initial_weight=3.0, weight_step=0.5, stats=None):
+        self.problem = problem
+        self.heuristic = heuristic
+        self.weight = initial_weight
+        self.weight_step = weight_step
+        self.stats = stats if stats is not None else SearchStats()
+        self.path = None
+        self.cost = float('inf')
+        self.bound = float('inf')
+
+        self.costs = {}  # state key -> cost of the cheapest path to it found
+        self.h = {}  # state key -> heuristic value
+        self.closed = closed_set()
+        self.inconsistent = {}  # state key -> node of closed states reached for less since
+        self.frontier = util.IndexedPriorityQueue(lambda node: self.problem.state_key(node.get_state()))
+        first_state = problem.get_start_state()
+        self._push(Node((first_state, None, 0), None), problem.state_key(first_state))
+        self.stats.generated += 1
+
+    def solutions(self, time_limit=None):
+        """
+        Searches with lower and lower weights, yielding (path, cost, bound)
+        every time a cheaper path is found or the bound is tightened, until
+        the best path is proven optimal or <time_limit> seconds have passed.
+        """
+        clock = time.perf_counter
+        search_start = clock()
+        deadline = None if time_limit is None else search_start + time_limit
+        try:
+            while True:
+                cost = self.cost
+                finished = self._improve_path(deadline)
+                if not finished:
+                    if self.cost < cost:
+                        yield self.path, self.cost, self.bound
+                    return
+
+                lowest = min([node.get_cost() + self.h[self.problem.state_key(node.get_state())]
+                              for node in self.frontier.items() + list(self.inconsistent.values())],
+                             default=float('inf'))
+                bound = 1.0 if lowest >= self.cost else max(1.0, min(self.weight, self.cost / lowest))
+                if self.path is not None and (self.cost < cost or bound < self.bound):
+                    self.bound = bound
+                    yield self.path, self.cost, self.bound
+                if self.bound <= 1.0 or (self.weight <= 1.0 and self.path is None):
+                    return
+                self._lower_weight()
+        finally:
+            self.stats.total_time += clock() - search_start
+
+    def search(self, time_limit=None):
+        """
+        Returns the best path found within <time_limit> seconds.
+        """
+        for _ in self.solutions(time_limit):
+            pass
+        return self.path if self.path is not None else FAILURE
+
+    def _improve_path(self, deadline):
+        """
+        One weighted A* search, expanding nodes while they may lead to a
+        cheaper path than the best one. Returns False if the deadline passed.
+        """
+        problem = self.problem
+        stats = self.stats
+        clock = time.perf_counter
+        while not self.frontier.isEmpty() and self.frontier.peek_priority() < self.cost:
+            if deadline is not None and clock() > deadline:
+                return False
+            start = clock()
+            node = self.frontier.pop()
+            stats.queue_time += clock() - start
+            state = node.get_state()
+            cost = node.get_cost()
+            if problem.is_goal_state(state):
+                if cost < self.cost:
+                    self.path = get_path(node)
+                    self.cost = cost
+                    self.bound = self.weight
+                continue
+            self.closed.add(problem.state_key(state))
+
+            for (new_state, action, step_cost) in iter_successors(problem, state, stats):
+                key = problem.state_key(new_state)
+                new_cost = cost + step_cost
+                if new_cost >= self.costs.get(key, float('inf')):
+                    stats.duplicates += 1
+                    continue
+                new_node = Node((new_state, action, new_cost), node)
+                stats.generated += 1
+                if key in self.closed:
+                    self.inconsistent[key] = new_node
+                    self.costs[key] = new_cost
+                else:
+                    self._push(new_node, key)
+            stats.peak_frontier = max(stats.peak_frontier, len(self.frontier))
+            stats.peak_closed = max(stats.peak_closed, len(self.closed))
+        return True
+
+    def _push(self, node, key):
+        stats = self.stats
+        clock = time.perf_counter
+        if key not in self.h:
+            start = clock()
+            self.h[key] = self.heuristic(node.get_state(), self.problem)
+            stats.heuristic_time += clock() - start
+        cost = node.get_cost()
+        self.costs[key] = cost
+        start = clock()
+        self.frontier.push_or_decrease(node, cost + self.weight * self.h[key], -cost)
+        stats.queue_time += clock() - start
+
+    def _lower_weight(self):
+        """
+        Lowers the weight, and queues the open and inconsistent nodes again
+        with their new priorities for the next search.
+        """
+        self.weight = max(1.0, self.weight - self.weight_step)
+        nodes = self.frontier.items() + list(self.inconsistent.values())
+        self.frontier = util.IndexedPriorityQueue(self.frontier.key)
+        self.inconsistent = {}
+        self.closed = closed_set()
+        for node in nodes:
+            self._push(node, self.problem.state_key(node.get_state()))
+
+
+def anytime_repairing_a_star_search(problem, heuristic=null_heuristic, stats=None, time_limit=None,
+                                    initial_weight=3.0, weight_step=0.5, on_solution=None):
+    """
+    Runs AnytimeRepairingAStar for up to <time_limit> seconds and returns
+    the best path found. on_solution(path, cost, bound) is called with
+    every improvement.
+    """
+    search = AnytimeRepairingAStar(problem, heuristic, initial_weight, weight_step, stats)
+    for (path, cost, bound) in search.solutions(time_limit):
+        if on_solution is not None:
+            on_solution(path, cost, bound)
+    return search.path if search.path is not None else FAILURE
+
+
+# Messages between parallel_a_star_search and its workers
+_START = 'start'
+_NODES = 'nodes'
+_INCUMBENT = 'incumbent'
+_PROBE = 'probe'
+_STATUS = 'status'
+_SOLUTION = 'solution'
+_STOP = 'stop'
+_DONE = 'done'
+_ERROR = 'error'
+
+
+def parallel_a_star_search(problem, heuristic=null_heuristic, workers=2, stats=None):
+    """
+    Hash distributed A* (HDA*) over <workers> processes.
+
+    Every state is owned by the worker hash(problem.state_key(state)) picks,
+    which keeps the open and closed entries of the states it owns. A worker
+    expands its best node and sends each successor to its owner, where it
+    is heuristically evaluated and queued. Goals found are reported here and
+    broadcast as the incumbent solution, below whose cost the workers keep
+    searching. The search ends when, in two probes in a row, every worker is
+    out of nodes cheaper than the incumbent and every node sent has been
+    received, which proves the incumbent optimal for an admissible heuristic.
+
+    Successors travel between processes as deltas: the parent, through
+    problem.pack_node and problem.unpack_node, once per expansion and
+    owner, and the action and cost of each successor, through
+    problem.encode_action and problem.decode_action. The owner rebuilds the
+    parent once and the successors from it with problem.get_result. The
+    stats are summed over the workers.
+    """
+    if stats is None:
+        stats = SearchStats()
+    clock = time.perf_counter
+    search_start = clock()
+    if 'fork' in multiprocessing.get_all_start_methods():
+        # Forked workers share the problem and the heuristic without pickling
+        # them, and agree with us on hash().
+        context = multiprocessing.get_context('fork')
+    else:
+        context = multiprocessing.get_context()
+
+    inboxes = [context.Queue() for _ in range(workers)]
+    results = context.Queue()
+    processes = [context.Process(target=_parallel_a_star_worker, args=(problem, heuristic, index, inboxes, results),
+                                 daemon=True)
+                 for index in range(workers)]
+    for process in processes:
+        process.start()
+
+    try:
+        first_state = problem.get_start_state()
+        owner = hash(problem.state_key(first_state)) % workers
+        inboxes[owner].put((_START, problem.pack_node(first_state, [])))
+
+        incumbent = float('inf')
+        best = None
+        last_counts = None
+        wave = 0
+        while True:
+            wave += 1
+            for inbox in inboxes:
+                inbox.put((_PROBE, wave))
+            # The start node is the one node message we sent.
+            replies, idle, sent, received = 0, True, 1, 0
+            while replies < workers:
+                message = _get_result(results)
+                if message[0] == _SOLUTION and message[1] < incumbent:
+                    incumbent, best = message[1], message[2]
+                    for inbox in inboxes:
+                        inbox.put((_INCUMBENT, incumbent))
+                elif message[0] == _STATUS and message[1] == wave:
+                    replies += 1
+                    idle = idle and message[2]
+                    sent += message[3]
+                    received += message[4]
+
+            counts = (sent, received) if idle and sent == received else None
+            if counts is not None and counts == last_counts:
+                break
+            last_counts = counts
+
+        for inbox in inboxes:
+            inbox.put((_STOP,))
+        done = 0
+        while done < workers:
+            message = _get_result(results)
+            if message[0] == _DONE:
+                done += 1
+                _add_stats(stats, message[1])
+        for process in processes:
+            process.join()
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        stats.total_time += clock() - search_start
+
+    if hasattr(problem, 'expanded'):
+        # The workers counted their expansions on their own copies.
+        problem.expanded += stats.expanded
+    if best is None:
+        return FAILURE
+    state, actions = problem.unpack_node(best)
+    return list(actions)
+
+
+def _get_result(results):
+    message = results.get()
+    if message[0] == _ERROR:
+        raise Exception('parallel A* worker failed:\n' + message[1])
+    return message
+
+
+def _add_stats(stats, worker_stats):
+    """
+    Adds the counts and times of one worker to <stats>. The peaks are added
+    too, as the workers hold their frontiers and closed sets side by side.
+    """
+    for name in ('generated', 'expanded', 'duplicates', 'peak_frontier', 'peak_closed',
+                 'successor_time', 'heuristic_time', 'queue_time'):
+        setattr(stats, name, getattr(stats, name) + getattr(worker_stats, name))
+
+
+def _parallel_a_star_worker(problem, heuristic, index, inboxes, results):
+    """
+    One worker of parallel_a_star_search, owning the states hashed to <index>.
+    """
+    try:
+        _run_parallel_a_star_worker(problem, heuristic, index, inboxes, results)
+    except Exception:
+        results.put((_ERROR, traceback.format_exc()))
+
+
+def _run_parallel_a_star_worker(problem, heuristic, index, inboxes, results):
+    inbox = inboxes[index]
+    workers = len(inboxes)
+    stats = SearchStats()
+    clock = time.perf_counter
+    frontier = []  # heap of (f, -cost, tie breaker, cost, state, actions), deepest first among equal f
+    closed = {}
+    counter = itertools.count()
+    incumbent = float('inf')
+    sent = received = 0
+    outgoing = [[] for _ in range(workers)]  # (action code, cost) of the successors to send each worker
+
+    def insert(state, actions, cost):
+        if closed.get(problem.state_key(state), float('inf')) <= cost:
+            stats.duplicates += 1
+            return
+        start = clock()
+        f = cost + heuristic(state, problem)
+        stats.heuristic_time += clock() - start
+        if f < incumbent:
+            start = clock()
+            heapq.heappush(frontier, (f, -cost, next(counter), cost, state, actions))
+            stats.queue_time += clock() - start
+            stats.generated += 1
+
+    while True:
+        busy = bool(frontier) and frontier[0][0] < incumbent
+        try:
+            # Handle every message before working, and wait for one when idle.
+            message = inbox.get(block=not busy)
+        except queue.Empty:
+            message = None
+
+        if message is not None:
+            if message[0] == _START:
+                received += 1
+                state, actions = problem.unpack_node(message[1])
+                insert(state, list(actions), 0)
+            elif message[0] == _NODES:
+                received += 1
+                start = clock()
+                parent, actions = problem.unpack_node(message[1])
+                successors = []
+                for (code, cost) in message[2]:
+                    action = problem.decode_action(code)
+                    successors.append((problem.get_result(parent, action), list(actions) + [action], cost))
+                stats.successor_time += clock() - start
+                for (state, actions, cost) in successors:
+                    insert(state, actions, cost)
+            elif message[0] == _INCUMBENT:
+                incumbent = min(incumbent, message[1])
+            elif message[0] == _PROBE:
+                results.put((_STATUS, message[1], not busy, sent, received))
+            elif message[0] == _STOP:
+                results.put((_DONE, stats))
+                return
+            continue
+
+        start = clock()
+        f, _, _, cost, state, actions = heapq.heappop(frontier)
+        stats.queue_time += clock() - start
+        key = problem.state_key(state)
+        if closed.get(key, float('inf')) <= cost:
+            stats.duplicates += 1
+            continue
+        if problem.is_goal_state(state):
+            incumbent = cost
+            results.put((_SOLUTION, cost, problem.pack_node(state, actions)))
+            continue
+        closed[key] = cost
+
+        for (new_state, action, step_cost) in iter_successors(problem, state, stats):
+            owner = hash(problem.state_key(new_state)) % workers
+            if owner == index:
+                insert(new_state, actions + [action], cost + step_cost)
+            else:
+                outgoing[owner].append((problem.encode_action(action), cost + step_cost))
+        packed = None
+        for owner in range(workers):
+            if outgoing[owner]:
+                if packed is None:
+                    packed = problem.pack_node(state, actions)
+                inboxes[owner].put((_NODES, packed, outgoing[owner]))
+                outgoing[owner] = []
+                sent += 1
+        stats.peak_frontier = max(stats.peak_frontier, len(frontier))
+        stats.peak_closed = max(stats.peak_closed, len(closed))
 
 
 class Node:
@@ -216,6 +1669,178 @@ class Node:
         return self.parent
 
 
+class NodeStore:
+    """
+    Makes the nodes graph_search keeps in its frontier: linked Node objects.
+    """
+
+    def make_node(self, state, action, cost, parent):
+        return Node((state, action, cost), parent)
+
+    def get_state(self, node):
+        return node.get_state()
+
+    def get_cost(self, node):
+        return node.get_cost()
+
+    def get_path(self, node):
+        return get_path(node)
+
+    def release_state(self, node):
+        """
+        Called once graph_search no longer needs the state of <node>
+        """
+        pass
+
+
+class ArrayNodeStore(NodeStore):
+    """
+    Keeps the nodes in parallel arrays instead of Node objects, so that a
+    node costs a few array items instead of two Python objects. A node is an
+    int id indexing the parent, action id, cost and state slot arrays.
+
+    Costs are kept as 64-bit integers until the first cost that is not an
+    integer, which turns them all into floats. Actions are interned: each
+    distinct action is kept once and the nodes hold its index. The states
+    live in a list the slots index, and the slot of a released state is
+    handed to the next node made, so only the states of the nodes still in
+    the frontier are kept alive.
+    """
+
+    def __init__(self):
+        self.parents = array.array('q')
+        self.action_ids = array.array('q')
+        self.costs = array.array('q')
+        self.slots = array.array('q')
+        self.states = []
+        self.free_slots = []
+        self.actions = []
+        self.action_index = {}
+
+    def make_node(self, state, action, cost, parent):
+        if self.free_slots:
+            slot = self.free_slots.pop()
+            self.states[slot] = state
+        else:
+            slot = len(self.states)
+            self.states.append(state)
+        self.slots.append(slot)
+        return self._append(action, cost, parent)
+
+    def _append(self, action, cost, parent):
+        "Appends the parent, action id and cost of a new node, and returns its id"
+        if action is None:
+            action_id = -1
+        else:
+            action_id = self.action_index.get(action)
+            if action_id is None:
+                action_id = self.action_index[action] = len(self.actions)
+                self.actions.append(action)
+        self.parents.append(-1 if parent is None else parent)
+        self.action_ids.append(action_id)
+        try:
+            self.costs.append(cost)
+        except TypeError:
+            self.costs = array.array('d', self.costs)
+            self.costs.append(cost)
+        return len(self.parents) - 1
+
+    def get_state(self, node):
+        return self.states[self.slots[node]]
+
+    def get_cost(self, node):
+        return self.costs[node]
+
+    def get_path(self, node):
+        path = []
+        while self.parents[node] != -1:
+            path.append(self.actions[self.action_ids[node]])
+            node = self.parents[node]
+        path.reverse()
+        return path
+
+    def release_state(self, node):
+        slot = self.slots[node]
+        if slot != -1:
+            self.states[slot] = None
+            self.free_slots.append(slot)
+            self.slots[node] = -1
+
+    def __len__(self):
+        return len(self.parents)
+
+
+class ReplayNodeStore(ArrayNodeStore):
+    """
+    An ArrayNodeStore that does not keep the states of its nodes: a node is
+    its parent, action, cost and the fingerprint of its state key. Its state
+    is rebuilt when asked for, by replaying the actions down from the
+    nearest ancestor whose state is at hand with the problem's get_result.
+
+    The start state is always kept, and the last <cache_size> states
+    rebuilt in a least recently used cache. States asked for are mostly the
+    ones popped for expansion, whose children come up next, so replays are
+    usually short. This spends CPU on the rebuilds to keep no state in the
+    frontier; priority_frontier keys the nodes by their stored fingerprint.
+    """
+
+    def __init__(self, problem, cache_size=1024):
+        ArrayNodeStore.__init__(self)
+        self.problem = problem
+        self.keys = array.array('Q')
+        self.cache = collections.OrderedDict()
+        self.cache_size = cache_size
+        self.first_state = None
+        self.replayed = 0
+
+    def make_node(self, state, action, cost, parent):
+        if parent is None:
+            self.first_state = state
+        self.keys.append(util.fingerprint(self.problem.state_key(state)))
+        return self._append(action, cost, parent)
+
+    def get_key(self, node):
+        return self.keys[node]
+
+    def restore(self, first_state, parents, action_ids, costs, keys, actions):
+        """
+        Fills the empty store with the nodes a SearchCheckpoint saved
+        """
+        self.first_state = first_state
+        self.parents.extend(parents)
+        self.action_ids.extend(action_ids)
+        self.costs = array.array(costs.typecode, costs)
+        self.keys.extend(keys)
+        for action in actions:
+            self.action_index[action] = len(self.actions)
+            self.actions.append(action)
+
+    def get_state(self, node):
+        cache = self.cache
+        state = cache.get(node)
+        if state is not None:
+            cache.move_to_end(node)
+            return state
+
+        actions = []
+        ancestor = node
+        while self.parents[ancestor] != -1 and ancestor not in cache:
+            actions.append(self.actions[self.action_ids[ancestor]])
+            ancestor = self.parents[ancestor]
+        state = self.first_state if self.parents[ancestor] == -1 else cache[ancestor]
+        for action in reversed(actions):
+            state = self.problem.get_result(state, action)
+        self.replayed += len(actions)
+
+        cache[node] = state
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return state
+
+    def release_state(self, node):
+        pass
+
+
 def get_path(last_node):
     path = []
     cur_node = last_node
@@ -228,6 +1853,14 @@ def get_path(last_node):
 
 # Abbreviations
 bfs = breadth_first_search
+ebfs = external_breadth_first_search
 dfs = depth_first_search
+ipdfs = in_place_depth_first_search
 astar = a_star_search
+idastar = ida_star
+peastar = partial_expansion_a_star_search
+hdastar = parallel_a_star_search
+arastar = anytime_repairing_a_star_search
 ucs = uniform_cost_search
+bibfs = bidirectional_breadth_first_search
+biastar = bidirectional_a_star_search
@@ -9,6 +9,8 @@
 import sys
 import inspect
 import heapq, random
+import array
+import collections
 
 """
  Data structures useful for implementing SearchAgents
@@ -33,16 +35,19 @@ class Stack:
         "Returns true if the stack is empty"
         return len(self.list) == 0
 
+    def __len__(self):
+        return len(self.list)
+
 
 class Queue:
     "A container with a first-in-first-out (FIFO) queuing policy."
 
     def __init__(self):
-        self.list = []
+        self.list = collections.deque()
 
     def push(self, item):
         "Enqueue the 'item' into the queue"
-        self.list.insert(0, item)
+        self.list.appendleft(item)
 
     def pop(self):
         """
@@ -55,6 +60,9 @@ class Queue:
         "Returns true if the queue is empty"
         return len(self.list) == 0
 
+    def __len__(self):
+        return len(self.list)
+
 
 class PriorityQueue:
     """
@@ -89,6 +97,347 @@ class PriorityQueue:
     def isEmpty(self):
         return len(self.heap) == 0
 
+    def __len__(self):
+        return len(self.heap)
+
+
+# Insertion orders for items that tie in an IndexedPriorityQueue or BucketPriorityQueue
+FIFO = 'fifo'
+LIFO = 'lifo'
+
+
+class IndexedPriorityQueue:
+    """
+      A binary heap priority queue that holds at most one item per key,
+      where key(item) gives the key of an item (the item itself by default).
+
+      push_or_decrease(item, priority, tie) adds an item whose key is not
+      queued yet, or replaces the queued item of that key if the new
+      priority is lower, moving it up the heap. Items are popped by lowest
+      priority, then lowest tie, then in the <order> (LIFO or FIFO) they
+      were last pushed or decreased in. After a push_or_decrease, replaced
+      holds the item it replaced, or None.
+
+      PriorityQueue leaves items that tie in an arbitrary heap order, which
+      no order here reproduces, so a search that switches to this queue can
+      pop tied nodes in another order. With an admissible heuristic that
+      only changes which optimal path is returned; with an inadmissible one
+      (blokus_corners_heuristic, for one) it can change the cost found.
+    """
+
+    def __init__(self, key=None, order=LIFO):
+        self.key = key
+        self.heap = []  # [(priority, tie, insertion count), key, item] entries
+        self.index = {}  # key -> position of its entry in heap
+        self.count = 0
+        self.step = -1 if order == LIFO else 1
+        self.replaced = None
+
+    def push_or_decrease(self, item, priority, tie=0):
+        """
+          Returns True if the item was added or its priority decreased, and
+          False if its key is already queued with a priority at most as low.
+        """
+        self.replaced = None
+        key = item if self.key is None else self.key(item)
+        position = self.index.get(key)
+        if position is None:
+            self._insert(key, item, (priority, tie, self.count))
+            self.count += self.step
+            return True
+        entry = self.heap[position]
+        if priority >= entry[0][0]:
+            return False
+        entry[0] = (priority, tie, self.count)
+        self.replaced = entry[2]
+        entry[2] = item
+        self.count += self.step
+        self._sift_up(position)
+        return True
+
+    push = push_or_decrease
+
+    def pop(self):
+        heap = self.heap
+        entry = heap[0]
+        last = heap.pop()
+        del self.index[entry[1]]
+        if heap:
+            heap[0] = last
+            self.index[last[1]] = 0
+            self._sift_down(0)
+        return entry[2]
+
+    def isEmpty(self):
+        return len(self.heap) == 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def peek_priority(self):
+        "Returns the priority of the item pop would return"
+        return self.heap[0][0][0]
+
+    def items(self):
+        "Returns the queued items, in no particular order"
+        return [entry[2] for entry in self.heap]
+
+    def _insert(self, key, item, order_key):
+        self.heap.append([order_key, key, item])
+        self._sift_up(len(self.heap) - 1)
+
+    def _sift_up(self, position):
+        heap = self.heap
+        index = self.index
+        entry = heap[position]
+        while position > 0:
+            parent = (position - 1) >> 1
+            above = heap[parent]
+            if above[0] < entry[0]:
+                break
+            heap[position] = above
+            index[above[1]] = position
+            position = parent
+        heap[position] = entry
+        index[entry[1]] = position
+
+    def _sift_down(self, position):
+        heap = self.heap
+        index = self.index
+        size = len(heap)
+        entry = heap[position]
+        while True:
+            child = 2 * position + 1
+            if child >= size:
+                break
+            below = heap[child]
+            if child + 1 < size and heap[child + 1][0] < below[0]:
+                child += 1
+                below = heap[child]
+            if entry[0] < below[0]:
+                break
+            heap[position] = below
+            index[below[1]] = position
+            position = child
+        heap[position] = entry
+        index[entry[1]] = position
+
+
+class BucketPriorityQueue:
+    """
+      An IndexedPriorityQueue for integer priorities (Dial's buckets): one
+      bucket of items per priority, and a cursor on the lowest non-empty one.
+      Pushes are O(1), and so are pops when priorities only grow by small
+      steps, as path costs with small integer step costs do. Within a
+      bucket, items are kept in a deque per tie value.
+
+      push_or_decrease leaves the replaced item in its bucket, to be skipped
+      when it comes up, and in replaced like IndexedPriorityQueue does. The
+      first priority that is not an integer turns the queue into an
+      IndexedPriorityQueue holding the same items.
+    """
+
+    def __init__(self, key=None, order=LIFO):
+        self.key = key
+        self.order = order
+        self.buckets = {}  # priority -> {tie: deque of (key, entry)}
+        self.index = {}  # key -> its live [priority, tie, insertion count, item] entry
+        self.low = None  # no live entry has a lower priority
+        self.count = 0
+        self.heap = None  # the IndexedPriorityQueue taking over, if any
+        self.replaced = None
+
+    def push_or_decrease(self, item, priority, tie=0):
+        """
+          Returns True if the item was added or its priority decreased, and
+          False if its key is already queued with a priority at most as low.
+        """
+        if self.heap is not None:
+            added = self.heap.push_or_decrease(item, priority, tie)
+            self.replaced = self.heap.replaced
+            return added
+        try:
+            bucket = int(priority)
+        except (OverflowError, TypeError, ValueError):
+            bucket = None
+        if bucket is None or bucket != priority:
+            self._use_heap()
+            return self.push_or_decrease(item, priority, tie)
+
+        self.replaced = None
+        key = item if self.key is None else self.key(item)
+        entry = self.index.get(key)
+        if entry is None:
+            entry = [bucket, tie, self.count, item]
+            self.count += 1
+        elif bucket < entry[0]:
+            self.replaced = entry[3]
+            entry = [bucket, tie, self.count, item]
+            self.count += 1
+        else:
+            return False
+        self.index[key] = entry
+
+        ties = self.buckets.get(bucket)
+        if ties is None:
+            ties = self.buckets[bucket] = {}
+        if tie in ties:
+            ties[tie].append((key, entry))
+        else:
+            ties[tie] = collections.deque([(key, entry)])
+        if self.low is None or bucket < self.low:
+            self.low = bucket
+        return True
+
+    push = push_or_decrease
+
+    def pop(self):
+        if self.heap is not None:
+            return self.heap.pop()
+        buckets = self.buckets
+        index = self.index
+        if not index:
+            raise IndexError('pop from an empty priority queue')
+        lifo = self.order == LIFO
+        while True:
+            ties = buckets.get(self.low)
+            while ties:
+                tie = min(ties)
+                items = ties[tie]
+                while items:
+                    key, entry = items.pop() if lifo else items.popleft()
+                    if index.get(key) is entry:
+                        del index[key]
+                        if not items:
+                            del ties[tie]
+                        return entry[3]
+                del ties[tie]
+            if ties is not None:
+                del buckets[self.low]
+            self.low += 1
+
+    def isEmpty(self):
+        return len(self) == 0
+
+    def __len__(self):
+        if self.heap is not None:
+            return len(self.heap)
+        return len(self.index)
+
+    def __contains__(self, key):
+        if self.heap is not None:
+            return key in self.heap
+        return key in self.index
+
+    def _use_heap(self):
+        self.heap = IndexedPriorityQueue(self.key, self.order)
+        self.heap.count = self.count if self.order == FIFO else -self.count
+        for ties in self.buckets.values():
+            for items in ties.values():
+                for (key, entry) in items:
+                    if self.index.get(key) is entry:
+                        count = entry[2] if self.order == FIFO else -entry[2]
+                        self.heap._insert(key, entry[3], (entry[0], entry[1], count))
+        self.buckets = self.index = None
+
+
+FINGERPRINT_MASK = (1 << 64) - 1
+
+
+def fingerprint(key):
+    """
+      The 64-bit fingerprint of a state key: the key itself for ints, and
+      hash(key) otherwise. Python salts the hash of str and bytes per
+      process, so keys holding them fingerprint differently in every run
+      unless PYTHONHASHSEED is set; fingerprints of ints and tuples of ints
+      (the keys of the problems here) are the same in every run.
+    """
+    if isinstance(key, int):
+        return key & FINGERPRINT_MASK
+    return hash(key) & FINGERPRINT_MASK
+
+
+class FingerprintSet:
+    """
+      A set of state keys that keeps only their 64-bit fingerprints, in one
+      array of slots with open addressing (linear probing). The array is
+      doubled when two thirds full, so a key takes 12 to 24 bytes instead
+      of the key object and a set slot.
+
+      Two keys with the same fingerprint are taken for the same key. With
+      verify=True the keys are kept as well, and a key colliding with
+      another one raises an exception: for debugging, as it costs more
+      memory than a set.
+    """
+
+    def __init__(self, keys=(), verify=False, capacity=1024):
+        size = 1
+        while size < capacity:
+            size <<= 1
+        self.slots = array.array('Q', bytes(8 * size))
+        self.bits = size.bit_length() - 1
+        self.size = 0
+        self.has_zero = False
+        self.verify = {} if verify else None
+        for key in keys:
+            self.add(key)
+
+    def _find(self, fp):
+        "Returns the slot holding fp, or the empty slot it would go in"
+        slots = self.slots
+        mask = len(slots) - 1
+        position = ((fp * 0x9E3779B97F4A7C15) & FINGERPRINT_MASK) >> (64 - self.bits)
+        while True:
+            found = slots[position]
+            if found == fp or found == 0:
+                return position
+            position = (position + 1) & mask
+
+    def _check(self, key, fp):
+        known = self.verify.setdefault(fp, key)
+        if known != key:
+            raise Exception('Fingerprint collision between state keys %r and %r' % (known, key))
+
+    def add(self, key):
+        fp = fingerprint(key)
+        if self.verify is not None:
+            self._check(key, fp)
+        if fp == 0:
+            if not self.has_zero:
+                self.has_zero = True
+                self.size += 1
+            return
+        position = self._find(fp)
+        if self.slots[position] == 0:
+            self.slots[position] = fp
+            self.size += 1
+            if 3 * self.size > 2 * len(self.slots):
+                self._grow()
+
+    def __contains__(self, key):
+        fp = fingerprint(key)
+        if fp == 0:
+            found = self.has_zero
+        else:
+            found = self.slots[self._find(fp)] != 0
+        if found and self.verify is not None:
+            self._check(key, fp)
+        return found
+
+    def __len__(self):
+        return self.size
+
+    def _grow(self):
+        old_slots = self.slots
+        self.slots = array.array('Q', bytes(16 * len(old_slots)))
+        self.bits += 1
+        for fp in old_slots:
+            if fp:
+                self.slots[self._find(fp)] = fp
+
 
 class PriorityQueueWithFunction(PriorityQueue):
     """